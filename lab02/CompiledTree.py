@@ -0,0 +1,225 @@
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+from PointSet import FeaturesTypes
+
+if TYPE_CHECKING:
+    # Tree imports this module, the import is only for the annotations
+    from Tree import Node
+
+# split_types value of the leaves
+LEAF = -1
+
+def preorder_nodes(root: 'Node') -> List['Node']:
+    """List the nodes of a tree, each node before its left subtree,
+    itself before its right subtree. This is the numbering used by
+    CompiledTree."""
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if not node.is_leaf():
+            stack.append(node.right_node)
+            stack.append(node.left_node)
+    return nodes
+
+class CompiledTree:
+    """A fitted decision Tree flattened into parallel arrays
+
+    Node i of the tree is described by the i-th element of each
+    array. The root is node 0.
+
+    Attributes
+    ----------
+        feature_index : np.array[int]
+            The index of the feature along which each node is split
+            (-1 for the leaves)
+        split_types : np.array[int]
+            The FeaturesTypes value of the split feature of each node
+            (LEAF for the leaves)
+        split_value : np.array[float]
+            The category (CLASSES) or the threshold (REAL) of each
+            node, NaN for boolean splits and for the leaves
+        left : np.array[int]
+            The index of the left child of each node (split_feature = true),
+            -1 for the leaves
+        right : np.array[int]
+            The index of the right child of each node (split_feature = false),
+            -1 for the leaves
+        leaf_value : np.array[bool]
+            The label given to the points reaching each node
+            (the majority label of its training points)
+        true_count : np.array[int]
+            The number of training points of each node with a true label
+        false_count : np.array[int]
+            The number of training points of each node with a false label
+    """
+    def __init__(self, root: 'Node'):
+        """
+        Parameters
+        ----------
+            root : Node
+                The root of a fitted Tree
+        """
+        nodes = preorder_nodes(root)
+        ids = {id(node): i for i, node in enumerate(nodes)}
+
+        self.feature_index = np.full(len(nodes), -1, dtype=np.intp)
+        self.split_types = np.full(len(nodes), LEAF, dtype=np.int8)
+        self.split_value = np.full(len(nodes), np.nan)
+        self.left = np.full(len(nodes), -1, dtype=np.intp)
+        self.right = np.full(len(nodes), -1, dtype=np.intp)
+        self.leaf_value = np.array([node.decision for node in nodes], dtype=bool)
+        self.true_count = np.array([node.true_count for node in nodes], dtype=np.int64)
+        self.false_count = np.array([node.false_count for node in nodes], dtype=np.int64)
+        for i, node in enumerate(nodes):
+            if node.is_leaf():
+                continue
+            self.feature_index[i] = node.split_feature_index
+            self.split_types[i] = node.split_type.value
+            if node.split_value is not None:
+                self.split_value[i] = node.split_value
+            self.left[i] = ids[id(node.left_node)]
+            self.right[i] = ids[id(node.right_node)]
+
+    @classmethod
+    def from_arrays(cls,
+                    feature_index: np.ndarray,
+                    split_types: np.ndarray,
+                    split_value: np.ndarray,
+                    left: np.ndarray,
+                    right: np.ndarray,
+                    true_count: np.ndarray,
+                    false_count: np.ndarray) -> 'CompiledTree':
+        """Build a compiled tree straight from its arrays, without nodes
+
+        Parameters
+        ----------
+            feature_index, split_types, split_value, left, right, true_count, false_count
+                The arrays of the tree, numbered as the attributes of
+                the same names (see preorder_nodes())
+
+        Returns
+        -------
+            CompiledTree
+                The compiled tree, whose leaf values follow from the
+                label counts as Node.decision does
+        """
+        compiled = cls.__new__(cls)
+        compiled.feature_index = np.asarray(feature_index, dtype=np.intp)
+        compiled.split_types = np.asarray(split_types, dtype=np.int8)
+        compiled.split_value = np.asarray(split_value, dtype=float)
+        compiled.left = np.asarray(left, dtype=np.intp)
+        compiled.right = np.asarray(right, dtype=np.intp)
+        compiled.true_count = np.asarray(true_count, dtype=np.int64)
+        compiled.false_count = np.asarray(false_count, dtype=np.int64)
+        compiled.leaf_value = compiled.true_count > compiled.false_count
+        return compiled
+
+    def get_leaves(self, features: List[List[float]]) -> np.ndarray:
+        """Find the leaves a batch of unlabeled points fall in
+
+        All the points still in an inner node move down one level at
+        each step, so the loop runs at most height-of-the-tree times.
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+
+        Returns
+        -------
+            np.array[int]
+                The index of the leaf reached by each point
+        """
+        if len(features) == 0:
+            return np.zeros(0, dtype=np.intp)
+        features = np.asarray(features, dtype=float)
+        nodes = np.zeros(len(features), dtype=np.intp)
+        rows = np.arange(len(features))
+        rows = rows[self.split_types[nodes] != LEAF]
+        while len(rows):
+            rows = self._descend(features, nodes, rows)
+        return nodes
+
+    def _descend(self, features: np.ndarray, nodes: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Move the given rows of `nodes` one level down and return
+        the rows that are still in an inner node"""
+        current = nodes[rows]
+        values = features[rows, self.feature_index[current]]
+        split_types = self.split_types[current]
+        split_value = self.split_value[current]
+        go_left = np.where(split_types == FeaturesTypes.BOOLEAN.value, values != 0,
+                           np.where(split_types == FeaturesTypes.CLASSES.value,
+                                    values == split_value, values < split_value))
+        current = np.where(go_left, self.left[current], self.right[current])
+        nodes[rows] = current
+        return rows[self.split_types[current] != LEAF]
+
+    def predict(self, features: List[List[float]]) -> np.ndarray:
+        """Give the guessed labels of a batch of unlabeled points
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+
+        Returns
+        -------
+            np.array[bool]
+                The label guessed for each point, the same as
+                Tree.decide() would give
+        """
+        return self.leaf_value[self.get_leaves(features)]
+
+    def predict_proba(self, features: List[List[float]]) -> np.ndarray:
+        """Give the probability of a true label for a batch of unlabeled points
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+
+        Returns
+        -------
+            np.array[float]
+                For each point, the same value as Tree.decide_proba()
+        """
+        leaves = self.get_leaves(features)
+        return self.true_count[leaves]/(self.true_count[leaves] + self.false_count[leaves])
+
+    def predict_depths(self, features: List[List[float]], depths: List[int]) -> np.ndarray:
+        """Give the labels guessed by the tree cut at several depths,
+        in a single pass over the levels
+
+        The tree cut at depth d gives a point the label of the node of
+        depth d it reaches (or of its leaf if the leaf is shallower),
+        which is what a tree grown with h = d gives, as long as this
+        tree was grown with the same min_split_points.
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+            depths : List[int]
+                The depths at which the tree is cut.
+
+        Returns
+        -------
+            np.array[bool]
+                One line per depth, the labels of the points guessed by
+                the tree cut at this depth
+        """
+        features = np.asarray(features, dtype=float)
+        predictions = np.zeros((len(depths), len(features)), dtype=bool)
+        nodes = np.zeros(len(features), dtype=np.intp)
+        rows = np.arange(len(features))
+        rows = rows[self.split_types[nodes] != LEAF]
+        for depth in range(max(depths, default=-1) + 1):
+            for i, cut_depth in enumerate(depths):
+                if cut_depth == depth:
+                    predictions[i] = self.leaf_value[nodes]
+            if len(rows):
+                rows = self._descend(features, nodes, rows)
+        return predictions
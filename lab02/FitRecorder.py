@@ -0,0 +1,158 @@
+from typing import Callable, Dict
+
+import threading
+import time
+
+class NodeRecord:
+    """What growing one node of a Tree cost
+
+    Attributes
+    ----------
+        depth : int
+            The depth of the node (the root is at depth 0)
+        size : int
+            The number of training points of the node
+        split_feature_index : int
+            The feature the node was split along, None for the leaves
+        wall_time : float
+            The time spent on the node (Gini score, split search and
+            partition, not its children), in seconds
+        candidates : Dict[int, int]
+            The number of candidate splits scored along each feature
+        feature_time : Dict[int, float]
+            The time spent searching each feature, in seconds
+        gini_evaluations : int
+            The number of Gini_split scores computed (the Gini score
+            of the node itself comes with its LabelStats)
+        rows_partitioned : int
+            The number of row indices sent to one side or the other
+            when the node was split (its points and its sorted orders)
+        bytes_allocated : int
+            The size of the arrays allocated by the split of the node
+            (masks, row indices and sorted orders of the children)
+    """
+    def __init__(self, depth: int, size: int):
+        self.depth = depth
+        self.size = size
+        self.split_feature_index = None
+        self.wall_time = 0.0
+        self.candidates = {}
+        self.feature_time = {}
+        self.gini_evaluations = 0
+        self.rows_partitioned = 0
+        self.bytes_allocated = 0
+        # the features of a node may be searched by several threads
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._elapsed = 0.0
+
+    def pause(self) -> None:
+        """Stop the clock of the node while it waits (for instance in
+        the queue of a best-first growth)"""
+        self._elapsed += time.perf_counter() - self._start
+        self._start = None
+
+    def resume(self) -> None:
+        """Restart the clock of the node after pause()"""
+        if self._start is None:
+            self._start = time.perf_counter()
+
+    def add_candidates(self, feature_index: int, count: int) -> None:
+        """Count `count` candidate splits scored along a feature,
+        one Gini_split each"""
+        with self._lock:
+            self.candidates[feature_index] = self.candidates.get(feature_index, 0) + count
+            self.gini_evaluations += count
+
+    def add_feature_time(self, feature_index: int, seconds: float) -> None:
+        with self._lock:
+            self.feature_time[feature_index] = self.feature_time.get(feature_index, 0.0) + seconds
+
+    def add_partition(self, rows: int, nbytes: int) -> None:
+        with self._lock:
+            self.rows_partitioned += rows
+            self.bytes_allocated += nbytes
+
+    def as_dict(self) -> Dict:
+        """The record as plain values (for instance to dump it as JSON)"""
+        return {'depth': self.depth, 'size': self.size, 'split_feature_index': self.split_feature_index,
+                'wall_time': self.wall_time, 'candidates': dict(self.candidates),
+                'feature_time': dict(self.feature_time), 'gini_evaluations': self.gini_evaluations,
+                'rows_partitioned': self.rows_partitioned, 'bytes_allocated': self.bytes_allocated}
+
+class FitRecorder:
+    """Collects a NodeRecord for every node grown by a Tree
+
+    Give it to the `recorder` parameter of Tree. Without a recorder,
+    the tree and its point sets only test that it is None.
+
+    Attributes
+    ----------
+        records : List[NodeRecord]
+            The records of the nodes, in the order they were completed
+        callback : Callable[[NodeRecord], None]
+            If given, called with each record once its node is done
+            (from the thread that grew the node)
+    """
+    def __init__(self, callback: Callable[[NodeRecord], None] = None):
+        """
+        Parameters
+        ----------
+            callback : Callable[[NodeRecord], None] default=None
+                See the `callback` attribute.
+        """
+        self.records = []
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def start_node(self, depth: int, size: int) -> NodeRecord:
+        """Start timing a node"""
+        return NodeRecord(depth, size)
+
+    def finish_node(self, record: NodeRecord, split_feature_index: int = None) -> None:
+        """Stop timing a node and keep its record"""
+        record.resume()
+        record.wall_time = record._elapsed + time.perf_counter() - record._start
+        record.split_feature_index = split_feature_index
+        with self._lock:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def report(self) -> Dict:
+        """Sum the records up by feature and by depth
+
+        Returns
+        -------
+            Dict
+                'nodes': the number of nodes and the totals of all the
+                counters; 'by_feature': for each feature, the candidates
+                scored, the search time and the number of nodes split
+                along it; 'by_depth': for each depth, the number of
+                nodes, their points and the totals of their counters
+        """
+        totals = {'nodes': 0, 'wall_time': 0.0, 'gini_evaluations': 0,
+                  'rows_partitioned': 0, 'bytes_allocated': 0}
+        by_feature = {}
+        by_depth = {}
+        for record in self.records:
+            depth = by_depth.setdefault(record.depth, {'nodes': 0, 'size': 0, 'wall_time': 0.0,
+                                                       'gini_evaluations': 0, 'rows_partitioned': 0,
+                                                       'bytes_allocated': 0})
+            for summary in (totals, depth):
+                summary['nodes'] += 1
+                summary['wall_time'] += record.wall_time
+                summary['gini_evaluations'] += record.gini_evaluations
+                summary['rows_partitioned'] += record.rows_partitioned
+                summary['bytes_allocated'] += record.bytes_allocated
+            depth['size'] += record.size
+            for feature_index in record.candidates.keys() | record.feature_time.keys():
+                feature = by_feature.setdefault(feature_index, {'candidates': 0, 'time': 0.0, 'splits': 0})
+                feature['candidates'] += record.candidates.get(feature_index, 0)
+                feature['time'] += record.feature_time.get(feature_index, 0.0)
+            if record.split_feature_index is not None:
+                by_feature.setdefault(record.split_feature_index,
+                                      {'candidates': 0, 'time': 0.0, 'splits': 0})['splits'] += 1
+        return {'nodes': totals,
+                'by_feature': dict(sorted(by_feature.items())),
+                'by_depth': dict(sorted(by_depth.items()))}
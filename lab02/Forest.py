@@ -0,0 +1,170 @@
+from typing import List
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from PointSet import FeaturesTypes
+from Tree import Tree
+
+# the training points of a worker process, attached to the shared memory of the forest
+_worker_data = {}
+
+class Forest:
+    """A bagged forest of decision Trees
+
+    Each tree is trained on a bootstrap sample of the points (drawn
+    with replacement) and may only split along a random subset of the
+    features. The label of a point is the majority vote of the trees.
+
+    Attributes
+    ----------
+        types : List[FeaturesTypes]
+            The types of the features.
+        trees : List[Tree]
+            The fitted trees (lean, without their training points)
+        samples : List[np.array[int]]
+            The rows of the training points each tree was trained on
+        feature_subsets : List[List[int]]
+            The features each tree was allowed to split along
+    """
+    def __init__(self,
+                 features: List[List[float]],
+                 labels: List[bool],
+                 types: List[FeaturesTypes],
+                 n_trees: int = 10,
+                 h: int = 1,
+                 min_split_points: int = 1,
+                 max_features: int = None,
+                 n_jobs: int = 1,
+                 seed: int = 0):
+        """
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the training points, see Tree.
+            labels : List[bool]
+                The labels of the training points.
+            types : List[FeaturesTypes]
+                The types of the features.
+            n_trees : int default=10
+                The number of trees of the forest.
+            h : int default=1
+                The height of each tree.
+            min_split_points : int default=1
+                The minimal number of training points in each node.
+            max_features : int default=None
+                The number of features each tree may split along, by
+                default the square root of the number of features.
+            n_jobs : int default=1
+                The number of processes training the trees, -1 for one
+                per CPU. The workers read the training points from one
+                shared memory block instead of receiving a copy. The
+                forest does not depend on it.
+            seed : int default=0
+                The seed of the bootstrap samples and feature subsets.
+        """
+        features = np.asarray(features, dtype=float)
+        labels = np.asarray(labels, dtype=bool)
+        self.types = types
+        if max_features is None:
+            max_features = max(1, int(np.sqrt(len(types))))
+        generator = np.random.default_rng(seed)
+        self.samples = []
+        self.feature_subsets = []
+        for _ in range(n_trees):
+            self.samples.append(np.sort(generator.integers(0, len(labels), len(labels))))
+            self.feature_subsets.append(sorted(generator.choice(len(types), min(max_features, len(types)),
+                                                                replace=False).tolist()))
+        tree_params = {'h': h, 'min_split_points': min_split_points}
+
+        if n_jobs == 1:
+            self.trees = [Tree(features, labels, types, indices=sample, candidate_features=subset, **tree_params)
+                          for sample, subset in zip(self.samples, self.feature_subsets)]
+            return
+
+        # copy the points once into shared memory, the workers map it read-only
+        features_memory = shared_memory.SharedMemory(create=True, size=max(features.nbytes, 1))
+        labels_memory = shared_memory.SharedMemory(create=True, size=max(labels.nbytes, 1))
+        try:
+            np.ndarray(features.shape, features.dtype, features_memory.buf)[:] = features
+            np.ndarray(labels.shape, labels.dtype, labels_memory.buf)[:] = labels
+            with ProcessPoolExecutor(None if n_jobs < 0 else n_jobs,
+                                     initializer=_attach_worker,
+                                     initargs=(features_memory.name, features.shape,
+                                               labels_memory.name, labels.shape, types)) as executor:
+                self.trees = list(executor.map(_fit_worker_tree, self.samples, self.feature_subsets,
+                                               [tree_params]*n_trees))
+        finally:
+            features_memory.close()
+            features_memory.unlink()
+            labels_memory.close()
+            labels_memory.unlink()
+
+    def predict_proba(self, features: List[List[float]]) -> np.ndarray:
+        """Give the share of the trees voting true for a batch of points
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+
+        Returns
+        -------
+            np.array[float]
+                For each point, the proportion of trees that give it
+                a true label
+        """
+        features = np.asarray(features, dtype=float)
+        votes = np.zeros(len(features), dtype=np.int64)
+        for tree in self.trees:
+            votes += tree.predict(features)
+        return votes/len(self.trees)
+
+    def predict(self, features: List[List[float]]) -> np.ndarray:
+        """Give the guessed labels of a batch of unlabeled points
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+
+        Returns
+        -------
+            np.array[bool]
+                The label given by the majority of the trees to each
+                point (false on a tie)
+        """
+        return self.predict_proba(features) > 0.5
+
+    def decide(self, features: List[float]) -> bool:
+        """Give the guessed label of the forest to an unlabeled point
+
+        Parameters
+        ----------
+            features : List[float]
+                The features of the unlabeled point.
+
+        Returns
+        -------
+            bool
+                The label given by the majority of the trees
+        """
+        return bool(self.predict([features])[0])
+
+def _attach_worker(features_name: str, features_shape: tuple,
+                   labels_name: str, labels_shape: tuple,
+                   types: List[FeaturesTypes]) -> None:
+    """Map the shared training points in a worker process"""
+    # the memory blocks stay referenced for the life of the worker
+    _worker_data['memory'] = (shared_memory.SharedMemory(name=features_name),
+                              shared_memory.SharedMemory(name=labels_name))
+    features = np.ndarray(features_shape, np.float64, _worker_data['memory'][0].buf)
+    labels = np.ndarray(labels_shape, np.bool_, _worker_data['memory'][1].buf)
+    features.flags.writeable = False
+    labels.flags.writeable = False
+    _worker_data['points'] = (features, labels, types)
+
+def _fit_worker_tree(sample: np.ndarray, feature_subset: List[int], tree_params: dict) -> Tree:
+    """Train one tree of the forest in a worker process"""
+    features, labels, types = _worker_data['points']
+    return Tree(features, labels, types, indices=sample, candidate_features=feature_subset, **tree_params)
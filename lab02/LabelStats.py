@@ -0,0 +1,68 @@
+from typing import List, Tuple
+
+import numpy as np
+
+class LabelStats:
+    """The label counts of the points of a node and their Gini score
+
+    The counts of the root are computed from its labels, the counts of
+    the children are derived from the counts of the winning split of
+    their parent (see split()), so no node counts its labels again.
+
+    Attributes
+    ----------
+        size : int
+            The number of points
+        true_count : int
+            The number of points with a true label
+        false_count : int
+            The number of points with a false label
+    """
+    __slots__ = ('size', 'true_count', 'false_count', '_gini')
+
+    def __init__(self, true_count: int, false_count: int):
+        """
+        Parameters
+        ----------
+            true_count : int
+                The number of points with a true label
+            false_count : int
+                The number of points with a false label
+        """
+        self.size = true_count + false_count
+        self.true_count = true_count
+        self.false_count = false_count
+        self._gini = None
+
+    @classmethod
+    def from_labels(cls, labels: List[bool]) -> 'LabelStats':
+        """Count the labels of a set of points"""
+        true_count = int(np.count_nonzero(labels))
+        return cls(true_count, len(labels) - true_count)
+
+    @property
+    def gini(self) -> float:
+        """The Gini score of the points, computed on first access"""
+        if self._gini is None:
+            self._gini = 1 - (self.true_count/self.size)**2 - (self.false_count/self.size)**2
+        return self._gini
+
+    def split(self, true_size: int, true_labels: int) -> Tuple['LabelStats', 'LabelStats']:
+        """Derive the statistics of the two sides of a split
+
+        Parameters
+        ----------
+            true_size : int
+                The number of points on the true side of the split
+            true_labels : int
+                The number of true labels on the true side of the split
+
+        Returns
+        -------
+            LabelStats
+                The statistics of the true side
+            LabelStats
+                The statistics of the false side
+        """
+        return (LabelStats(true_labels, true_size - true_labels),
+                LabelStats(self.true_count - true_labels, self.false_count - (true_size - true_labels)))
@@ -1,7 +1,12 @@
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+import os
+import threading
+import time
 import numpy as np
+from LabelStats import LabelStats
 
 class FeaturesTypes(Enum):
     """Enumerate possible features types"""
@@ -9,6 +14,160 @@ class FeaturesTypes(Enum):
     CLASSES=1
     REAL=2
 
+# thread pools shared by all the point sets, one per number of workers
+_executors = {}
+_executors_lock = threading.Lock()
+
+def _get_executor(n_jobs: int) -> ThreadPoolExecutor:
+    """Returns the shared pool of `n_jobs` threads (-1 for one per CPU)"""
+    if n_jobs < 0:
+        n_jobs = os.cpu_count()
+    with _executors_lock:
+        if n_jobs not in _executors:
+            _executors[n_jobs] = ThreadPoolExecutor(n_jobs)
+        return _executors[n_jobs]
+
+def _gini_split_from_counts(size: int, true_labels: np.ndarray, true_sizes: np.ndarray, total_true_labels: int) -> np.ndarray:
+    """Computes the Gini_split score of several candidate splits at once
+
+    Parameters
+    ----------
+    size : int
+        The number of points in the set being split
+    true_labels : np.array[int]
+        For each candidate, the number of points with a true label
+        on the true side of the split
+    true_sizes : np.array[int]
+        For each candidate, the number of points on the true side
+        of the split
+    total_true_labels : int
+        The number of points with a true label in the whole set
+
+    Returns
+    -------
+    np.array[float]
+        The Gini split of each candidate. Candidates with an empty
+        side get a meaningless value and must be filtered out by
+        the caller. Given Python ints instead of arrays, the result
+        is the Python float of the original formula.
+    """
+    false_sizes = size - true_sizes
+    false_labels = total_true_labels - true_labels
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gini_true = 1 - (true_labels/true_sizes)**2 - ((true_sizes - true_labels)/true_sizes)**2
+        gini_false = 1 - (false_labels/false_sizes)**2 - ((false_sizes - false_labels)/false_sizes)**2
+        return (true_sizes/size)*gini_true + (false_sizes/size)*gini_false
+
+def best_candidate(size: int, total_true_labels: int, true_sizes: np.ndarray, true_labels: np.ndarray,
+                   gini: float, min_split_points: int = 1) -> Tuple[int, float]:
+    """Pick the best of several candidate splits of a set of points
+
+    Parameters
+    ----------
+    size : int
+        The number of points in the set being split
+    total_true_labels : int
+        The number of points with a true label in the whole set
+    true_sizes : np.array[int]
+        For each candidate, the number of points on the true side
+    true_labels : np.array[int]
+        For each candidate, the number of points with a true label
+        on the true side
+    gini : float
+        The Gini score of the whole set of points
+    min_split_points : int
+        The minimal number of points on each side of a split
+
+    Returns
+    -------
+    int
+        The index of the candidate with the best Gini gain (the first
+        one in case of ties), None if no candidate leaves at least
+        min_split_points points (and at least one) on each side
+    float
+        The Gini gain of that candidate, None if there is none. It is
+        computed with Python floats, as compute_gini_split() does.
+    """
+    true_sizes = np.asarray(true_sizes)
+    true_labels = np.asarray(true_labels)
+    gini_splits = _gini_split_from_counts(size, true_labels, true_sizes, total_true_labels)
+    valid = (true_sizes >= max(min_split_points, 1)) & (size - true_sizes >= max(min_split_points, 1))
+    if not valid.any():
+        return (None, None)
+    gini_gains = np.where(valid, gini - gini_splits, -np.inf)
+    # NumPy squares arrays with x*x while Python floats use pow(), which
+    # may round 1 ulp apart. The candidates within rounding of the best
+    # are scored again with Python floats, so that the gains and the
+    # ties (first candidate wins) are the same for every feature type
+    # and the same as scoring each candidate on its own.
+    near_best = np.flatnonzero(gini_gains >= gini_gains.max() - 1e-12)
+    best = None
+    max_gini_gain = None
+    for candidate in near_best:
+        gini_gain = gini - _gini_split_from_counts(int(size), int(true_labels[candidate]),
+                                                   int(true_sizes[candidate]), int(total_true_labels))
+        if max_gini_gain is None or gini_gain > max_gini_gain:
+            best = int(candidate)
+            max_gini_gain = gini_gain
+    return (best, float(max_gini_gain))
+
+def best_histogram_threshold(bin_sizes: np.ndarray, bin_true_labels: np.ndarray,
+                             bin_min: np.ndarray, bin_max: np.ndarray,
+                             gini: float, min_split_points: int = 1) -> Tuple[float, float, int, int]:
+    """Find the best threshold of a binned REAL feature from its histogram
+
+    The candidates are the boundaries between consecutive non empty
+    bins, in increasing order.
+
+    Parameters
+    ----------
+    bin_sizes : np.array[int]
+        The number of points of the set in each bin
+    bin_true_labels : np.array[int]
+        The number of points of the set with a true label in each bin
+    bin_min : np.array[float]
+        The smallest value of each bin
+    bin_max : np.array[float]
+        The largest value of each bin
+    gini : float
+        The Gini score of the whole set of points
+    min_split_points : int
+        The minimal number of points on each side of a split
+
+    Returns
+    -------
+    float
+        The best Gini gain, None if no threshold gives a well defined
+        split (and then the other values are None as well)
+    float
+        The threshold that provides this gain, a real value of the
+        feature between the largest value of the last bin on the true
+        side and the smallest value of the first bin on the false side
+    int
+        The number of points on the true side (value < threshold)
+    int
+        The number of points with a true label on the true side
+    """
+    present_bins = np.flatnonzero(bin_sizes)
+    if len(present_bins) < 2:
+        return (None, None, None, None)
+    # the true side of candidate k holds the first k+1 non empty bins
+    true_sizes = np.cumsum(bin_sizes[present_bins])[:-1]
+    true_labels = np.cumsum(bin_true_labels[present_bins])[:-1]
+    best, gini_gain = best_candidate(int(bin_sizes.sum()), int(bin_true_labels.sum()), true_sizes, true_labels,
+                                     gini, min_split_points)
+    if best == None:
+        return (None, None, None, None)
+    
+    # map the bin boundary back to a real value, such that "value < threshold"
+    # keeps exactly the first best+1 non empty bins
+    max_true_value = bin_max[present_bins[best]]
+    min_false_value = bin_min[present_bins[best + 1]]
+    split_value = (max_true_value + min_false_value)/2
+    if not max_true_value < split_value:
+        split_value = min_false_value
+    return (gini_gain, split_value, int(true_sizes[best]), int(true_labels[best]))
+
 class PointSet:
     """A class representing set of training points.
 
@@ -19,9 +178,41 @@ class PointSet:
             features of each point
         features : np.array[float]
             2D array containing the features of the points. Each line
-            corresponds to a point, each column to a feature.
+            corresponds to a point, each column to a feature. This is
+            gathered from the shared feature matrix on each access, the
+            split searches only read the columns they need.
         labels : np.array[bool]
             1D array containing the labels of the points.
+        label_stats : LabelStats
+            The label counts and the Gini score of the points, counted
+            once for the root set and derived from the winning split
+            for the subsets.
+        all_features : np.array[float]
+            The feature matrix shared by this set and all the sets
+            split from it.
+        all_labels : np.array[bool]
+            The labels of all the rows of `all_features`.
+        indices : np.array[int]
+            The rows of the shared feature matrix that belong to this
+            set, None if the set holds every row of the matrix.
+        sorted_indices : Dict[int, np.array[int]]
+            For each REAL feature, the rows of the set sorted by the
+            value of that feature. None until presort() is called on
+            the root set, then passed down to every subset by
+            split_with_best_gain() so that no node has to sort again.
+            None again once the set has been split.
+        bins : Dict[int, Tuple[np.array[int], np.array[float], np.array[float]]]
+            For each binned REAL feature, the bin of every row of the
+            shared matrix and the smallest and largest value of each
+            bin. None unless bin_features() has been called on the
+            root set, then shared by all the sets split from it.
+        candidate_features : List[int]
+            The features along which the set may be split, None for
+            all of them. Shared by all the sets split from it.
+        record : NodeRecord
+            If not None, the split search of the set adds what it
+            costs to this record (see FitRecorder). Set by Tree on the
+            points of the node being grown, not passed to the subsets.
         split_feature_index : int
             along which feature the points have been split
         split_value: float
@@ -29,8 +220,24 @@ class PointSet:
             for categorical feature, split_value(true_class), the other value(false_class)
             for real feature, less than split_value(true_clas), greater than split_value(true_class)
             for boolean feature, split_value = None
+        split_label_counts : Tuple[int, int]
+            The number of points and of true labels on the true side
+            of the split found by get_best_gain(), None if unknown
+        reference_kernels : bool
+            Class-wide switch. When True, get_gini() and
+            compute_gini_split() use the original point-by-point
+            loops instead of the array-based kernels. Both give
+            the same results, the loops are only kept as a reference
+            to compare against.
     """
-    def __init__(self, features: List[List[float]], labels: List[bool], types: List[FeaturesTypes]):
+    reference_kernels = False
+
+    def __init__(self, features: List[List[float]], labels: List[bool], types: List[FeaturesTypes],
+                 indices: np.ndarray = None,
+                 sorted_indices: Dict[int, np.ndarray] = None,
+                 bins: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                 candidate_features: List[int] = None,
+                 label_stats: LabelStats = None):
         """
         Parameters
         ----------
@@ -39,20 +246,124 @@ class PointSet:
             list represents a point, each of its elements is a feature
             of the point. All the sublists should have the same size as
             the `types` parameter, and the list itself should have the
-            same size as the `labels` parameter.
+            same size as the `labels` parameter. A NumPy array, even
+            read-only or memory-mapped, is used as is without copy.
         labels : List[bool]
             The labels of the points.
         types : List[FeaturesTypes]
             The types of the features of the points.
+        indices : np.array[int]
+            If given, only these rows of `features` and `labels` belong
+            to the set. The feature matrix is then shared with the set
+            it was split from instead of being copied.
+        sorted_indices : Dict[int, np.array[int]]
+            The rows of the set sorted along each REAL feature, if
+            they are already known (see presort()).
+        bins : Dict[int, Tuple[np.array[int], np.array[float], np.array[float]]]
+            The bins of the REAL features, if they are already known
+            (see bin_features()).
+        candidate_features : List[int]
+            If given, only these features are considered by
+            get_best_gain() (for instance a random subset of them).
+        label_stats : LabelStats
+            The label counts of the set, if they are already known.
+            Otherwise the labels are counted once here.
         """
         self.types = types
-        self.features = np.array(features)
-        self.labels = np.array(labels)
+        self.all_features = np.asarray(features)
+        self.all_labels = np.asarray(labels)
+        self.indices = indices
+        self.sorted_indices = sorted_indices
+        self.bins = bins
+        self.candidate_features = candidate_features
+        self.record = None
+        if indices is None:
+            self.labels = self.all_labels
+        else:
+            self.labels = self.all_labels[indices]
+        if label_stats is None:
+            label_stats = LabelStats.from_labels(self.labels)
+        self.label_stats = label_stats
+        # (true side size, true labels) of the best split along each
+        # feature during a search, see get_best_gain()
+        self.candidate_counts = {}
+        self.split_label_counts = None
         # initialize these attributes to None
         # only get_best_gain() can set them
         self.split_feature_index = None 
         self.split_value = None
     
+    @property
+    def features(self) -> np.ndarray:
+        """The features of the points of the set (a copy if the set
+        only holds some rows of the shared matrix)"""
+        if self.indices is None:
+            return self.all_features
+        return self.all_features[self.indices]
+
+    def _column(self, feature_index: int) -> np.ndarray:
+        """Returns the values of one feature for the points of the set"""
+        if self.indices is None:
+            return self.all_features[:, feature_index]
+        return self.all_features[self.indices, feature_index]
+
+    def _candidates(self) -> List[int]:
+        """Returns the indexes of the features the set may be split along"""
+        if self.candidate_features is None:
+            return list(range(len(self.types)))
+        return self.candidate_features
+
+    def presort(self) -> None:
+        """Sort the points once along every REAL feature
+
+        The sorted orders are kept in `sorted_indices` and carried
+        down to the subsets by split_with_best_gain(), which keeps
+        them sorted, so the threshold searches of all the nodes below
+        become linear sweeps.
+        """
+        rows = np.arange(len(self.all_labels)) if self.indices is None else self.indices
+        self.sorted_indices = {}
+        for feature_index in self._candidates():
+            # binned features are searched from their histograms, they need no order
+            if self.types[feature_index] == FeaturesTypes.REAL and (self.bins is None or feature_index not in self.bins):
+                order = np.argsort(self._column(feature_index), kind='stable')
+                self.sorted_indices[feature_index] = rows[order]
+
+    def bin_features(self, max_bins: int) -> None:
+        """Quantize every REAL feature into at most `max_bins` bins
+
+        The bin edges are quantiles of the feature over all the rows of
+        the shared matrix. A feature with at most `max_bins` distinct
+        values gets one bin per value, so its splits are the same as
+        without binning. The bins are kept in `bins` and shared with
+        the subsets created by split_with_best_gain().
+
+        Parameters
+        ----------
+        max_bins : int
+            The maximal number of bins per feature, at most 65536
+        """
+        if max_bins < 2 or max_bins > 65536:
+            raise ValueError(f"max_bins must be between 2 and 65536, got {max_bins}")
+        bin_type = np.uint8 if max_bins <= 256 else np.uint16
+        self.bins = {}
+        for feature_index in self._candidates():
+            if self.types[feature_index] != FeaturesTypes.REAL:
+                continue
+            column = self.all_features[:, feature_index]
+            distinct_values = np.unique(column)
+            if len(distinct_values) <= max_bins:
+                edges = distinct_values[1:]
+            else:
+                edges = np.unique(np.quantile(column, np.linspace(0, 1, max_bins + 1)[1:-1]))
+            # bin k holds the values v such that edges[k-1] <= v < edges[k]
+            bin_ids = np.searchsorted(edges, column, side='right').astype(bin_type)
+            bin_min = np.full(len(edges) + 1, np.inf)
+            bin_max = np.full(len(edges) + 1, -np.inf)
+            np.minimum.at(bin_min, bin_ids, column)
+            np.maximum.at(bin_max, bin_ids, column)
+            self.bins[feature_index] = (bin_ids, bin_min, bin_max)
+
     def get_gini(self) -> float:
         """Computes the Gini score of the set of points
 
@@ -61,6 +372,13 @@ class PointSet:
         float
             The Gini score of the set of points
         """
+        if self.reference_kernels:
+            return self._get_gini_reference()
+        # computed once from the label counts of the set
+        return self.label_stats.gini
+
+    def _get_gini_reference(self) -> float:
+        """Loop version of get_gini(), kept as a reference"""
 
         gini = 0.0
         num_label_true = 0
@@ -94,28 +412,88 @@ class PointSet:
             The Gini split of points after splitting them
             into 2 sets along the feature
         """
+        if self.record is not None:
+            self.record.add_candidates(feature_index, 1)
+        if self.reference_kernels:
+            return self._compute_gini_split_reference(feature_index, split_value, min_split_points)
+        true_mask = self._split_mask(feature_index, split_value)
+        true_size = int(np.count_nonzero(true_mask))
+        false_size = len(true_mask) - true_size
+        
+        ## If a feature has the same value in all the points, it cannot be used to split the set
+        ##  return None beacause gini_split is not defined
+        if (true_size == 0 or false_size == 0):
+            return None
+        
+        # number of points associated to every node in the tree is not smaller than a given threshold
+        # if a split violate this constraint, abandon this split and return None
+        if (true_size < min_split_points or false_size < min_split_points):
+            return None
+        
+        true_labels = int(np.count_nonzero(self.labels[true_mask]))
+        self.candidate_counts[feature_index] = (true_size, true_labels)
+        return float(_gini_split_from_counts(len(true_mask), true_labels, true_size, self.label_stats.true_count))
+
+    def _split_mask(self, feature_index: int, split_value: float = None, rows: np.ndarray = None) -> np.ndarray:
+        """Computes on which side of a split each point falls
+
+        Parameters
+        ----------
+        feature_index : int
+            The index of the feature along which the points are split
+        split_value : float
+            The value of the feature along which the points are
+            split, for boolean feature, split_value = None
+        rows : np.array[int]
+            The rows of the shared matrix to test, in this order.
+            Defaults to the points of the set.
+
+        Returns
+        -------
+        np.array[bool]
+            True for the points of the first subset (split_feature = true)
+        """
+        if rows is None:
+            column = self._column(feature_index)
+        else:
+            column = self.all_features[rows, feature_index]
+        temp_type = self.types[feature_index]
+        if temp_type == FeaturesTypes.BOOLEAN:
+            return column != 0
+        elif temp_type == FeaturesTypes.CLASSES:
+            if split_value == None:
+                raise ValueError("split_value is None. A well defined split_value is needed for CLASSES type feature")
+            return column == split_value
+        else: # temp_type == FeaturesTypes.REAL
+            if split_value == None:
+                raise ValueError("split_value is None. A well defined split_value is needed for REAL type feature")
+            return column < split_value
+
+    def _compute_gini_split_reference(self, feature_index: int, split_value: float = None, min_split_points: int = 1) -> float:
+        """Loop version of compute_gini_split(), kept as a reference"""
+        column = self._column(feature_index)
         feature_true_indexs = []
         feature_false_indexs = []
         temp_type = self.types[feature_index]
         if temp_type == FeaturesTypes.BOOLEAN:
-            for j in range(len(self.features)):
-                if self.features[j][feature_index]:
+            for j in range(len(column)):
+                if column[j]:
                     feature_true_indexs.append(j)
                 else:   
                     feature_false_indexs.append(j)
         elif temp_type == FeaturesTypes.CLASSES:
             if split_value == None:
                 raise ValueError("split_value is None. A well defined split_value is needed for CLASSES type feature")
-            for j in range(len(self.features)):
-                if self.features[j][feature_index] == split_value: 
+            for j in range(len(column)):
+                if column[j] == split_value: 
                     feature_true_indexs.append(j)
                 else:
                     feature_false_indexs.append(j)
         else: # temp_type == FeaturesTypes.REAL
             if split_value == None:
                 raise ValueError("split_value is None. A well defined split_value is needed for REAL type feature")
-            for j in range(len(self.features)):
-                if self.features[j][feature_index] < split_value:
+            for j in range(len(column)):
+                if column[j] < split_value:
                     feature_true_indexs.append(j)
                 else:
                     feature_false_indexs.append(j)
@@ -151,14 +529,250 @@ class PointSet:
         gini_false = 1 - (num_label_true/len(feature_false_indexs))**2 - (num_label_false/len(feature_false_indexs))**2
         
         ## calculate gini_split
-        gini_split = (len(feature_true_indexs)/len(self.features))*gini_true + (len(feature_false_indexs)/len(self.features))*gini_false
+        gini_split = (len(feature_true_indexs)/len(column))*gini_true + (len(feature_false_indexs)/len(column))*gini_false
         return gini_split
     
     
-    def get_best_gain(self,min_split_points : int = 1) -> Tuple[int, float]:
+    def sweep_boolean_feature(self, feature_index: int, gini: float, min_split_points: int = 1) -> Tuple[float, None]:
+        """Score the split along a BOOLEAN feature
+
+        The single candidate (feature != 0 on the true side) is scored
+        by best_candidate(), as the candidates of the other types.
+
+        Parameters
+        ----------
+        feature_index : int
+            The index of the BOOLEAN feature
+        gini : float
+            The Gini score of the whole set of points
+        min_split_points : int
+            The minimal number of points on each side of a split
+
+        Returns
+        -------
+        float
+            The Gini gain of the split, None if it is not well defined
+        None
+            The split value of a boolean feature
+        """
+        if self.record is not None:
+            self.record.add_candidates(feature_index, 1)
+        true_mask = self._split_mask(feature_index)
+        true_size = int(np.count_nonzero(true_mask))
+        true_labels = int(np.count_nonzero(self.labels[true_mask]))
+        best, gini_gain = best_candidate(len(true_mask), self.label_stats.true_count, [true_size], [true_labels],
+                                         gini, min_split_points)
+        if best == None:
+            return (None, None)
+        self.candidate_counts[feature_index] = (true_size, true_labels)
+        return (gini_gain, None)
+
+    def sweep_classes_feature(self, feature_index: int, gini: float, min_split_points: int = 1) -> Tuple[float, float]:
+        """Find the best one-vs-rest split along a CLASSES feature
+
+        The (category, label) pairs are counted in one pass over the
+        column, then every split "feature == category" is scored from
+        that table.
+
+        Parameters
+        ----------
+        feature_index : int
+            The index of the CLASSES feature to scan
+        gini : float
+            The Gini score of the whole set of points
+        min_split_points : int
+            The minimal number of points on each side of a split
+
+        Returns
+        -------
+        float
+            The best Gini gain along this feature, None if no
+            category gives a well defined split
+        float
+            The category that provides this gain (the first one to
+            appear in the points in case of ties), None if no category
+            gives a well defined split
+        """
+        if len(self.labels) == 0:
+            return (None, None)
+        categories, first_seen, category_ids = np.unique(self._column(feature_index),
+                                                         return_index=True, return_inverse=True)
+        category_ids = category_ids.reshape(-1)
+        true_sizes = np.bincount(category_ids, minlength=len(categories))
+        true_labels = np.bincount(category_ids[self.labels.astype(bool)], minlength=len(categories))
+        # candidates are scored in order of first appearance, as the exhaustive search does
+        order = np.argsort(first_seen)
+        categories, true_sizes, true_labels = categories[order], true_sizes[order], true_labels[order]
+        if self.record is not None:
+            self.record.add_candidates(feature_index, len(categories))
+        best, gini_gain = best_candidate(len(category_ids), int(true_labels.sum()), true_sizes, true_labels,
+                                         gini, min_split_points)
+        if best == None:
+            return (None, None)
+        self.candidate_counts[feature_index] = (int(true_sizes[best]), int(true_labels[best]))
+        return (gini_gain, categories[best])
+    
+    def sweep_real_feature(self, feature_index: int, gini: float, min_split_points: int = 1) -> Tuple[float, float]:
+        """Find the best threshold along a REAL feature in a single sweep
+
+        The column is sorted once and the candidate thresholds are the
+        midpoints between consecutive distinct values, as in the
+        exhaustive search. The number of points (and of true labels)
+        on the left of every threshold is read from the sorted column
+        and a running count of the labels, so every candidate is
+        scored without rescanning the points.
+
+        Parameters
+        ----------
+        feature_index : int
+            The index of the REAL feature to scan
+        gini : float
+            The Gini score of the whole set of points
+        min_split_points : int
+            The minimal number of points on each side of a split
+
+        Returns
+        -------
+        float
+            The best Gini gain along this feature, None if no
+            threshold gives a well defined split
+        float
+            The threshold that provides this gain (the first one in
+            increasing order in case of ties), None if no threshold
+            gives a well defined split
+        """
+        if len(self.labels) < 2:
+            return (None, None)
+        if self.sorted_indices is not None and feature_index in self.sorted_indices:
+            sorted_rows = self.sorted_indices[feature_index]
+            sorted_values = self.all_features[sorted_rows, feature_index]
+            sorted_labels = self.all_labels[sorted_rows]
+        else:
+            column = self._column(feature_index)
+            order = np.argsort(column, kind='stable')
+            sorted_values = column[order]
+            sorted_labels = self.labels[order]
+        # cumulative_true[k] = number of true labels among the k smallest values
+        cumulative_true = np.zeros(len(sorted_values) + 1, dtype=np.int64)
+        np.cumsum(sorted_labels, out=cumulative_true[1:])
+        
+        # split_value = (max_left_value + min_right_value)/2
+        distinct_values = sorted_values[np.append(True, sorted_values[1:] != sorted_values[:-1])]
+        split_values = (distinct_values[:-1] + distinct_values[1:])/2
+        if len(split_values) == 0:
+            return (None, None)
+        if self.record is not None:
+            self.record.add_candidates(feature_index, len(split_values))
+        # points strictly lower than the threshold go to the true side
+        true_sizes = np.searchsorted(sorted_values, split_values, side='left')
+        best, gini_gain = best_candidate(len(sorted_values), int(cumulative_true[-1]), true_sizes,
+                                         cumulative_true[true_sizes], gini, min_split_points)
+        if best == None:
+            return (None, None)
+        self.candidate_counts[feature_index] = (int(true_sizes[best]), int(cumulative_true[true_sizes[best]]))
+        return (gini_gain, split_values[best])
+    
+    def sweep_binned_feature(self, feature_index: int, gini: float, min_split_points: int = 1) -> Tuple[float, float]:
+        """Find the best threshold along a binned REAL feature
+
+        Same as sweep_real_feature(), but the candidates are the
+        boundaries between the non empty bins of the set and they are
+        scored from a per-bin histogram of the labels, which costs
+        O(number of points + number of bins).
+
+        Parameters
+        ----------
+        feature_index : int
+            The index of the binned REAL feature to scan
+        gini : float
+            The Gini score of the whole set of points
+        min_split_points : int
+            The minimal number of points on each side of a split
+
+        Returns
+        -------
+        float
+            The best Gini gain along this feature, None if no
+            threshold gives a well defined split
+        float
+            The threshold that provides this gain, a real value of the
+            feature between the largest value of the last bin on the
+            true side and the smallest value of the first bin on the
+            false side. None if no threshold gives a well defined split
+        """
+        bin_ids, bin_min, bin_max = self.bins[feature_index]
+        if self.indices is not None:
+            bin_ids = bin_ids[self.indices]
+        bin_sizes = np.bincount(bin_ids, minlength=len(bin_min))
+        bin_true_labels = np.bincount(bin_ids[self.labels.astype(bool)], minlength=len(bin_min))
+        if self.record is not None:
+            # one candidate between each pair of consecutive non empty bins
+            self.record.add_candidates(feature_index, max(int(np.count_nonzero(bin_sizes)) - 1, 0))
+        gini_gain, split_value, true_size, true_labels = best_histogram_threshold(bin_sizes, bin_true_labels,
+                                                                                  bin_min, bin_max,
+                                                                                  gini, min_split_points)
+        if gini_gain != None:
+            self.candidate_counts[feature_index] = (true_size, true_labels)
+        return (gini_gain, split_value)
+    
+    def best_split_along(self, feature_index: int, gini: float, min_split_points: int = 1) -> Tuple[float, float]:
+        """Compute the best split of the set along one feature
+
+        Parameters
+        ----------
+        feature_index : int
+            The index of the feature
+        gini : float
+            The Gini score of the whole set of points
+        min_split_points : int
+            The minimal number of points on each side of a split
+
+        Returns
+        -------
+        float
+            The best Gini gain along this feature, None if no split
+            along it is well defined
+        float
+            The split value that provides this gain (None for a
+            boolean feature)
+        """
+        if self.record is not None:
+            start = time.perf_counter()
+            best_split = self._best_split_along(feature_index, gini, min_split_points)
+            self.record.add_feature_time(feature_index, time.perf_counter() - start)
+            return best_split
+        return self._best_split_along(feature_index, gini, min_split_points)
+
+    def _best_split_along(self, feature_index: int, gini: float, min_split_points: int = 1) -> Tuple[float, float]:
+        """best_split_along() without the timing"""
+        temp_type = self.types[feature_index]
+        if temp_type == FeaturesTypes.BOOLEAN:
+            if self.reference_kernels:
+                gini_split = self.compute_gini_split(feature_index, None, min_split_points)
+                if gini_split == None:
+                    return (None, None)
+                ## gini_gain = gini - gini_split
+                return (gini - gini_split, None)
+            return self.sweep_boolean_feature(feature_index, gini, min_split_points)
+        elif temp_type == FeaturesTypes.CLASSES:
+            return self.sweep_classes_feature(feature_index, gini, min_split_points)
+        else: # temp_type == FeaturesTypes.REAL
+            if self.bins is not None and feature_index in self.bins:
+                return self.sweep_binned_feature(feature_index, gini, min_split_points)
+            return self.sweep_real_feature(feature_index, gini, min_split_points)
+
+    def get_best_gain(self, min_split_points : int = 1, n_jobs: int = 1) -> Tuple[int, float]:
         """Compute the feature along which splitting provides the best gain
             set self.split_feature_index and self.split_value to which that provides best gain
 
+        Parameters
+        ----------
+        min_split_points : int
+            The minimal number of points on each side of a split
+        n_jobs : int
+            The number of threads searching the features in parallel,
+            -1 for one per CPU. The result does not depend on it.
+
         Returns
         -------
         int
@@ -172,57 +786,27 @@ class PointSet:
         best_feature_index = None
         best_split_value = None
         gini = self.get_gini()
+        self.candidate_counts = {}
+        self.split_label_counts = None
         
         ## split the set along each feature (each value if type is not bool) and calculate gini gain
-        for tmp_feature_index in range(len(self.features[0])):
-            tmp_split_value = None
-            temp_type = self.types[tmp_feature_index]
-            if temp_type == FeaturesTypes.BOOLEAN:
-                gini_split = self.compute_gini_split(tmp_feature_index, tmp_split_value, min_split_points)
-                if gini_split == None:
-                    continue 
-                ## gini_gain = gini - gini_split
-                gini_gain = gini - gini_split
-                if (gini_gain > max_gini_gain):
-                    max_gini_gain = gini_gain
-                    best_feature_index = tmp_feature_index
-                    best_split_value = tmp_split_value  
-            elif temp_type == FeaturesTypes.CLASSES:
-                feature_values = {}  # store all possible values of a feature, dict is quick for query
-                for i in range(len(self.features)):
-                    if self.features[i][tmp_feature_index] not in feature_values:
-                        feature_values[self.features[i][tmp_feature_index]] = 1
-                for tmp_split_value in feature_values:
-                    gini_split = self.compute_gini_split(tmp_feature_index, tmp_split_value, min_split_points)
-                    if gini_split == None:
-                        continue
-                    ## gini_gain = gini - gini_split
-                    gini_gain = gini - gini_split
-                    if (gini_gain > max_gini_gain):
-                        max_gini_gain = gini_gain
-                        best_feature_index = tmp_feature_index
-                        best_split_value = tmp_split_value
-            else: # temp_type == FeaturesTypes.REAL
-                feature_values = {} # store all possible values of a feature, dict is quick for query
-                split_values = [] # store all possible split values of a feature
-                for i in range(len(self.features)):
-                    if self.features[i][tmp_feature_index] not in feature_values:
-                        feature_values[self.features[i][tmp_feature_index]] = 1
-                key_list = list(feature_values.keys())
-                key_list.sort()
-                # split_value = (max_left_value + min_right_value)/2
-                for i in range(len(key_list)-1):
-                    split_values.append((key_list[i]+key_list[i+1])/2)
-                for tmp_split_value in split_values:
-                    gini_split = self.compute_gini_split(tmp_feature_index, tmp_split_value, min_split_points)
-                    if gini_split == None:
-                        continue
-                    ## gini_gain = gini - gini_split
-                    gini_gain = gini - gini_split
-                    if (gini_gain > max_gini_gain):
-                        max_gini_gain = gini_gain
-                        best_feature_index = tmp_feature_index
-                        best_split_value = tmp_split_value
+        feature_indexes = self._candidates()
+        if n_jobs == 1 or len(feature_indexes) < 2:
+            feature_splits = [self.best_split_along(tmp_feature_index, gini, min_split_points)
+                              for tmp_feature_index in feature_indexes]
+        else:
+            feature_splits = _get_executor(n_jobs).map(
+                lambda tmp_feature_index: self.best_split_along(tmp_feature_index, gini, min_split_points),
+                feature_indexes)
+        # the results come back in the order of the features, so ties
+        # still go to the first feature as in a serial search
+        for tmp_feature_index, (gini_gain, tmp_split_value) in zip(feature_indexes, feature_splits):
+            if gini_gain == None:
+                continue
+            if (gini_gain > max_gini_gain):
+                max_gini_gain = gini_gain
+                best_feature_index = tmp_feature_index
+                best_split_value = tmp_split_value
         
         ## If no feature provides a gain well-defined (gain>0), return (None, None)        
         if (max_gini_gain == 0.0):
@@ -231,6 +815,7 @@ class PointSet:
         # set these two attributes to the feature and value that provide best gain
         self.split_feature_index = best_feature_index
         self.split_value = best_split_value
+        self.split_label_counts = self.candidate_counts.get(best_feature_index)
         return (best_feature_index, max_gini_gain)      
             
        
@@ -247,53 +832,93 @@ class PointSet:
             raise ValueError("self.split_feature_index is None. get_best_threshold() called before get_best_gain() succeeds")
         return self.split_value     
 
-    def split_with_best_gain(self, min_split_points : int = 1)->(List[List[float]], List[bool], List[List[float]], List[bool]):
+    def split_with_best_gain(self, min_split_points : int = 1, n_jobs: int = 1) -> Tuple['PointSet', 'PointSet']:
         """Split the set of points along the feature that provides best gain
+
+        The subsets share the feature matrix of this set and only hold
+        the indices of their rows, so no point is copied. If the set
+        has been presorted, its sorted orders are split the same way,
+        which keeps them sorted, and handed over to the subsets (this
+        set drops them, a later search along a REAL feature sorts again).
         
         Returns
         -------
-        List[List[float]]
-            The features of the first subset of points (split_feature = true)
-        List[bool]
-            The labels of the first subset of points (split_feature = true)
-        List[List[float]]
-            The features of the second subset of points (split_feature = false)
-        List[bool]  
-            The labels of the second subset of points (split_feature = false)
+        PointSet
+            The first subset of points (split_feature = true)
+        PointSet
+            The second subset of points (split_feature = false)
         """
         # set self.split_feature_index and self.split_value to which that provides best gain
-        self.get_best_gain(min_split_points)
+        self.get_best_gain(min_split_points, n_jobs)
         
-        # if no split can reduces gini, return (None, None, None, None, None)
+        # if no split can reduces gini, return (None, None)
         if self.split_feature_index == None:
-            return (None, None, None, None)
+            return (None, None)
         
-        true_class_features = []
-        true_class_labels = []
-        false_class_features = []
-        false_class_labels = []
-        for i in range(len(self.labels)):
-            if self.types[self.split_feature_index] == FeaturesTypes.BOOLEAN:
-                if self.features[i][self.split_feature_index]:
-                    true_class_features.append(self.features[i])
-                    true_class_labels.append(self.labels[i])
-                else:   
-                    false_class_features.append(self.features[i])   
-                    false_class_labels.append(self.labels[i])
-            elif self.types[self.split_feature_index] == FeaturesTypes.CLASSES:
-                if self.features[i][self.split_feature_index] == self.split_value:
-                    true_class_features.append(self.features[i])
-                    true_class_labels.append(self.labels[i])
-                else:
-                    false_class_features.append(self.features[i])   
-                    false_class_labels.append(self.labels[i])
-            else: # temp_type == FeaturesTypes.REAL
-                if self.features[i][self.split_feature_index] < self.split_value:
-                    true_class_features.append(self.features[i])
-                    true_class_labels.append(self.labels[i])
-                else:
-                    false_class_features.append(self.features[i])   
-                    false_class_labels.append(self.labels[i])
+        return self.split_along(self.split_feature_index, self.split_value, self.split_label_counts)
+
+    def split_along(self, feature_index: int, split_value: float = None,
+                    label_counts: Tuple[int, int] = None) -> Tuple['PointSet', 'PointSet']:
+        """Split the set of points along a given split, without searching it
+
+        Sets self.split_feature_index and self.split_value to this split,
+        then partitions the points as split_with_best_gain() does.
+
+        Parameters
+        ----------
+        feature_index : int
+            The index of the feature along which the points are split
+        split_value : float
+            The category (CLASSES) or threshold (REAL) of the split,
+            None for a boolean feature
+        label_counts : Tuple[int, int]
+            The number of points and of true labels on the true side
+            of the split, if known from the search. Otherwise they are
+            counted from the partition.
+
+        Returns
+        -------
+        PointSet
+            The first subset of points (split_feature = true)
+        PointSet
+            The second subset of points (split_feature = false)
+        """
+        self.split_feature_index = feature_index
+        self.split_value = split_value
+        true_mask = self._split_mask(self.split_feature_index, self.split_value)
+        if self.indices is None:
+            true_indices = np.flatnonzero(true_mask)
+            false_indices = np.flatnonzero(~true_mask)
+        else:
+            true_indices = self.indices[true_mask]
+            false_indices = self.indices[~true_mask]
+        
+        if self.record is not None:
+            self.record.add_partition(len(true_mask), true_mask.nbytes + true_indices.nbytes + false_indices.nbytes)
         
-        return (true_class_features, true_class_labels, false_class_features, false_class_labels)
+        true_sorted_indices = None
+        false_sorted_indices = None
+        if self.sorted_indices is not None:
+            true_sorted_indices = {}
+            false_sorted_indices = {}
+            for feature_index, sorted_rows in self.sorted_indices.items():
+                sorted_true_mask = self._split_mask(self.split_feature_index, self.split_value, sorted_rows)
+                true_sorted_indices[feature_index] = sorted_rows[sorted_true_mask]
+                false_sorted_indices[feature_index] = sorted_rows[~sorted_true_mask]
+                if self.record is not None:
+                    self.record.add_partition(len(sorted_rows), sorted_true_mask.nbytes + sorted_rows.nbytes)
         
+        if label_counts is None:
+            label_counts = (len(true_indices), int(np.count_nonzero(self.labels[true_mask])))
+        true_stats, false_stats = self.label_stats.split(*label_counts)
+        true_points = PointSet(self.all_features, self.all_labels, self.types, true_indices, true_sorted_indices,
+                               self.bins, self.candidate_features, true_stats)
+        false_points = PointSet(self.all_features, self.all_labels, self.types, false_indices, false_sorted_indices,
+                                self.bins, self.candidate_features, false_stats)
+        if self.record is not None:
+            # the subsets gather their labels
+            self.record.add_partition(0, true_points.labels.nbytes + false_points.labels.nbytes)
+        # the subsets hold the sorted orders now, keeping them here too
+        # would keep a copy of the rows per level of the tree alive
+        self.sorted_indices = None
+        return (true_points, false_points)
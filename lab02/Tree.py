@@ -1,6 +1,13 @@
-from typing import List
+from typing import Dict, List
 
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+import collections
+import heapq
+import itertools
+import numpy as np
 from PointSet import PointSet, FeaturesTypes
+from CompiledTree import CompiledTree, LEAF
+from FitRecorder import FitRecorder
     
 class Node:
     """A node of a decision Tree
@@ -8,12 +15,32 @@ class Node:
     Attributes
     ----------
         points : PointSet
-            The training points of the node
+            The training points of the node, None once the tree has
+            been made lean (see Tree.make_lean())
         left_node : Node
             The left node of the tree
         right_node : Node
             The right node of the tree
+        split_feature_index : int
+            The index of the feature along which the node is split,
+            None for the leaves
+        split_type : FeaturesTypes
+            The type of that feature
+        split_value : float
+            The category (CLASSES) or threshold (REAL) of the split,
+            None for boolean splits and for the leaves
+        true_count : int
+            The number of training points of the node with a true label
+        false_count : int
+            The number of training points of the node with a false label
+        decision : bool
+            The label given to the points that end in this node
+            (the majority label of its training points)
     """
+    __slots__ = ('points', 'left_node', 'right_node',
+                 'split_feature_index', 'split_type', 'split_value',
+                 'true_count', 'false_count', 'decision')
+
     def __init__(self,
                  points: PointSet,
                  left_node: 'Node' = None,
@@ -22,7 +49,8 @@ class Node:
         Parameters
         ----------
             points : PointSet
-                The training points of the node
+                The training points of the node. If None, the label
+                counts have to be given with set_label_counts().
             left_node : Node
                 The left node of the tree (split_feature = true)
             right_node : Node
@@ -31,6 +59,21 @@ class Node:
         self.points = points
         self.left_node = left_node
         self.right_node = right_node
+        self.split_feature_index = None
+        self.split_type = None
+        self.split_value = None
+        # the label counts come with the points, decide() only reads them
+        if points is None:
+            self.set_label_counts(0, 0)
+        else:
+            self.set_label_counts(points.label_stats.true_count, points.label_stats.false_count)
+
+    def set_label_counts(self, true_count: int, false_count: int) -> None:
+        """Set the label counts of the training points of the node
+        and the decision that follows from them"""
+        self.true_count = true_count
+        self.false_count = false_count
+        self.decision = true_count > false_count
 
     def is_leaf(self)-> bool:
         """Returns True if the node is a leaf, False otherwise"""
@@ -45,9 +88,12 @@ class Tree:
     Attributes
     ----------
         points : PointSet
-            The training points of the tree
+            The training points of the tree, None if the tree is lean
+        types : List[FeaturesTypes]
+            The types of the features.
         root : Node
-            The root of the tree
+            The root of the tree. For a tree built with from_compiled(),
+            the nodes are built from `compiled` on first access.
         split_feature_index : int
             The index of the feature along which the points have been split
         split_value : float
@@ -55,14 +101,51 @@ class Tree:
             for categorical feature, split_value(left child), the other value(right child)
             for real feature, less than split_value(left child), greater than split_value(right child)
             for boolean feature, split_value = None
+        compiled : CompiledTree
+            The flattened form of the tree used by predict(), built on
+            first use (None until then)
+        recorder : FitRecorder
+            Records what growing each node costs, None if the growth
+            is not instrumented
+        max_bins : int
+            The number of bins of the REAL features, None if they are
+            not binned
+        candidate_features : List[int]
+            The features the tree may split along, None for all of them
+        max_leaves : int
+            The maximal number of leaves of a tree grown best-first,
+            None if unlimited
+        min_gain : float
+            The minimal Gini gain of a split of a tree grown best-first,
+            None if any positive gain is enough
+        breadth_first : bool
+            Whether generate() grows the nodes level by level
+            rather than depth-first
+        settings_known : bool
+            Whether the settings the tree was grown with (h,
+            min_split_points, max_bins, candidate_features) are all
+            known, which deepen() needs. False for the trees built
+            with from_nodes(), for instance by load_tree().
     """
             
     def __init__(self,
                  features: List[List[float]],
                  labels: List[bool],
                  types: List[FeaturesTypes],
-                 h: int = 1,
-                 min_split_points : int = 1):
+                 h: int = None,
+                 min_split_points : int = 1,
+                 lean: bool = True,
+                 max_bins: int = None,
+                 n_jobs: int = 1,
+                 subtree_jobs: int = 1,
+                 subtree_min_depth: int = 2,
+                 subtree_max_size: int = None,
+                 indices: np.ndarray = None,
+                 candidate_features: List[int] = None,
+                 recorder: FitRecorder = None,
+                 max_leaves: int = None,
+                 min_gain: float = None,
+                 breadth_first: bool = False):
         """
         Parameters
         ----------
@@ -76,21 +159,358 @@ class Tree:
                 `labels` parameter.
             types : List[FeaturesTypes]
                 The types of the features.
-            h : int default=1
+            h : int default=None
                 The height of the tree. The tree will have a maximum
-                depth of leaf (the root is at depth 0).
+                depth of leaf (the root is at depth 0). By default 1,
+                or unlimited if the tree is grown best-first (see
+                `max_leaves`).
+            min_split_points : int default=1
+                The minimal number of training points in each node.
+            lean : bool default=True
+                If True, the training points are dropped from the
+                nodes once the tree is grown (see make_lean()).
+            max_bins : int default=None
+                If given, the REAL features are quantized into at most
+                `max_bins` bins and the splits are searched from per-bin
+                histograms (see PointSet.bin_features()).
+            n_jobs : int default=1
+                The number of threads searching the features of a node
+                in parallel, -1 for one per CPU.
+            subtree_jobs : int default=1
+                The number of threads growing independent subtrees in
+                parallel. A node is handed to them once it is at depth
+                `subtree_min_depth` or deeper, or holds at most
+                `subtree_max_size` points. The tree does not depend on it.
+            subtree_min_depth : int default=2
+                See `subtree_jobs`.
+            subtree_max_size : int default=None
+                See `subtree_jobs`.
+            indices : np.array[int] default=None
+                If given, the tree is trained on these rows of `features`
+                only (they may repeat, as in a bootstrap sample). The
+                feature matrix is not copied.
+            candidate_features : List[int] default=None
+                If given, the tree only splits along these features.
+            recorder : FitRecorder default=None
+                If given, a NodeRecord of every node grown is added to
+                it (time, candidates and Gini scores per feature, rows
+                partitioned, bytes allocated). The tree does not
+                depend on it.
+            max_leaves : int default=None
+                If given (or if `min_gain` is), the tree is grown
+                best-first: the leaf whose best split has the largest
+                Gini gain is split first, until the tree has
+                `max_leaves` leaves or no leaf can be split (see
+                generate_best_first()). `h` still bounds the depth if
+                it is given, it must then allow `max_leaves` leaves.
+            min_gain : float default=None
+                If given, the tree is grown best-first and only the
+                splits with a Gini gain of at least `min_gain` are made.
+            breadth_first : bool default=False
+                If True, the nodes are split level by level instead of
+                depth-first (see generate()). The tree does not depend
+                on it, only the order in which the nodes are grown (and
+                so the split left in `split_feature_index` and
+                `split_value`).
         """
+        if max_leaves is not None and max_leaves < 1:
+            raise ValueError(f"max_leaves must be at least 1, not {max_leaves}")
+        if h is None and max_leaves is None and min_gain is None:
+            h = 1
+        if h is not None and max_leaves is not None and max_leaves > 2**h:
+            raise ValueError(f"a tree of height {h} cannot have {max_leaves} leaves, "
+                             "leave h to None for an unlimited depth")
+        self.types = types
+        self.h = h
+        self.min_split_points = min_split_points
+        self.n_jobs = n_jobs
+        self.subtree_min_depth = subtree_min_depth
+        self.subtree_max_size = subtree_max_size
+        self.recorder = recorder
+        self.max_bins = max_bins
+        self.candidate_features = candidate_features
+        self.max_leaves = max_leaves
+        self.min_gain = min_gain
+        self.breadth_first = breadth_first
+        self.settings_known = True
         # root contains all points
-        self.points = PointSet(features,labels,types)
+        self.points = self._root_points(features, labels, indices)
         self.root = Node(self.points,None,None)
+        self.compiled = None
         # generate the tree from the root
         # generate function will initialize the split_feature_index and split_value
         # by how the root is split
-        self.generate(self.root,h,types,min_split_points)
+        if max_leaves is not None or min_gain is not None:
+            self.generate_best_first(self.root,h,types,min_split_points)
+        elif subtree_jobs == 1:
+            self.generate(self.root,h,types,min_split_points)
+        else:
+            with ThreadPoolExecutor(None if subtree_jobs < 0 else subtree_jobs) as executor:
+                subtrees = []
+                self.generate(self.root,h,types,min_split_points,executor,subtrees)
+                # wait for the subtrees still growing, and raise their errors if any
+                for subtree in subtrees:
+                    subtree.result()
+        if lean:
+            self.make_lean()
         
         
-    def generate(self, pivot: Node, h:int, types, min_split_points : int = 1):
+    @classmethod
+    def from_nodes(cls, root: Node, types: List[FeaturesTypes],
+                   h: int = None, min_split_points: int = None,
+                   max_bins: int = None, candidate_features: List[int] = None,
+                   settings_known: bool = False) -> 'Tree':
+        """Build a Tree around nodes that have already been grown
+
+        Parameters
+        ----------
+            root : Node
+                The root of the fitted nodes
+            types : List[FeaturesTypes]
+                The types of the features.
+            h : int
+                The height the nodes were grown with, if known
+            min_split_points : int
+                The min_split_points the nodes were grown with, if known
+            max_bins : int
+                The max_bins the nodes were grown with
+            candidate_features : List[int]
+                The candidate_features the nodes were grown with
+            settings_known : bool default=False
+                Whether h, min_split_points, max_bins and
+                candidate_features are the settings the nodes were
+                grown with by Tree, so that deepen() can resume from them
+
+        Returns
+        -------
+            Tree
+                A lean tree using these nodes
+        """
+        tree = cls.__new__(cls)
+        tree._root = None
+        tree.types = types
+        tree.h = h
+        tree.min_split_points = min_split_points
+        tree.points = None
+        tree.root = root
+        tree.compiled = None
+        tree.n_jobs = 1
+        tree.subtree_min_depth = 2
+        tree.subtree_max_size = None
+        tree.recorder = None
+        tree.max_bins = max_bins
+        tree.candidate_features = candidate_features
+        tree.settings_known = settings_known
+        tree.max_leaves = None
+        tree.min_gain = None
+        tree.breadth_first = False
+        tree.split_feature_index = root.split_feature_index
+        tree.split_value = root.split_value
+        return tree
+
+    @classmethod
+    def from_compiled(cls, compiled: CompiledTree, types: List[FeaturesTypes],
+                      h: int = None, min_split_points: int = None) -> 'Tree':
+        """Build a Tree around a compiled tree, without its nodes
+
+        predict(), decide() and decide_proba() use the compiled tree
+        directly; the nodes are only built when something needs them
+        (get_leaf(), truncate(), codegen...).
+
+        Parameters
+        ----------
+            compiled : CompiledTree
+                The fitted tree
+            types : List[FeaturesTypes]
+                The types of the features.
+            h : int
+                The height the tree was grown with, if known
+            min_split_points : int
+                The min_split_points the tree was grown with, if known
+
+        Returns
+        -------
+            Tree
+                A lean tree using this compiled tree
+        """
+        tree = cls.from_nodes(Node(None), types, h, min_split_points)
+        tree._root = None
+        tree.compiled = compiled
+        tree.split_feature_index = None
+        tree.split_value = None
+        if compiled.split_types[0] != LEAF:
+            tree.split_feature_index = int(compiled.feature_index[0])
+            if compiled.split_types[0] != FeaturesTypes.BOOLEAN.value:
+                tree.split_value = float(compiled.split_value[0])
+        return tree
+
+    @property
+    def root(self) -> Node:
+        if self._root is None and self.compiled is not None:
+            self._root = self._nodes_from_compiled(self.compiled)
+        return self._root
+
+    @root.setter
+    def root(self, root: Node) -> None:
+        self._root = root
+
+    @staticmethod
+    def _nodes_from_compiled(compiled: CompiledTree) -> Node:
+        """Build the nodes of a compiled tree and return its root"""
+        nodes = [Node(None) for _ in range(len(compiled.left))]
+        # plain Python values are faster to read back than NumPy scalars
+        feature_index = compiled.feature_index.tolist()
+        split_types = compiled.split_types.tolist()
+        split_value = compiled.split_value.tolist()
+        left = compiled.left.tolist()
+        right = compiled.right.tolist()
+        for i, (node, true_count, false_count) in enumerate(zip(nodes, compiled.true_count.tolist(),
+                                                                compiled.false_count.tolist())):
+            node.set_label_counts(true_count, false_count)
+            if left[i] < 0:
+                continue
+            node.split_feature_index = feature_index[i]
+            node.split_type = FeaturesTypes(split_types[i])
+            if node.split_type != FeaturesTypes.BOOLEAN:
+                node.split_value = split_value[i]
+            node.left_node = nodes[left[i]]
+            node.right_node = nodes[right[i]]
+        return nodes[0]
+
+    def _root_points(self, features: List[List[float]], labels: List[bool], indices: np.ndarray = None) -> PointSet:
+        """Build the point set of the root from the training points"""
+        points = PointSet(features, labels, self.types, indices, candidate_features=self.candidate_features)
+        if self.max_bins is not None:
+            points.bin_features(self.max_bins)
+        # sort the REAL features once, the orders are split along with the points
+        points.presort()
+        return points
+
+    def deepen(self,
+               h: int,
+               min_split_points: int = None,
+               features: List[List[float]] = None,
+               labels: List[bool] = None,
+               indices: np.ndarray = None) -> 'Tree':
+        """Grow the fitted tree to a larger height, or with another
+        min_split_points, reusing the splits already made
+
+        With the same min_split_points, only the leaves at the old
+        height can be split further (the other leaves are pure or have
+        no split with a positive gain), so they are the only nodes
+        grown. With another min_split_points, the best split of every
+        inner node is searched again, the nodes whose split does not
+        change keep their subtrees and the others are grown again.
+        Either way the tree is the one a fresh fit would build.
+
+        Parameters
+        ----------
+            h : int
+                The new height of the tree. It may only be smaller than
+                the current one if min_split_points changes, see
+                truncate() otherwise.
+            min_split_points : int default=None
+                The new minimal number of training points in each node,
+                by default the one the tree was grown with.
+            features : List[List[float]] default=None
+            labels : List[bool] default=None
+            indices : np.array[int] default=None
+                The training points of the tree, as given to the
+                constructor. Only needed if the tree is lean: they are
+                then routed through the existing splits to find the
+                points of each node.
+
+        Returns
+        -------
+            Tree
+                The tree itself, grown in place
+        """
+        if not self.settings_known or self.h is None or self.min_split_points is None:
+            raise ValueError("the settings the tree was grown with are unknown (for instance a loaded tree), "
+                             "it cannot be deepened")
+        if self.max_leaves is not None or self.min_gain is not None:
+            raise ValueError("a tree grown best-first cannot be deepened")
+        if min_split_points is None:
+            min_split_points = self.min_split_points
+        if min_split_points == self.min_split_points and h < self.h:
+            raise ValueError(f"cannot deepen a tree of height {self.h} to height {h}, see truncate()")
+        lean = self.points is None
+        if lean:
+            if features is None or labels is None:
+                raise ValueError("the tree is lean, its training features and labels are needed to deepen it")
+            self._route_points(features, labels, indices)
+
+        # the nodes to grow from scratch, with their remaining height
+        to_grow = []
+        if min_split_points == self.min_split_points:
+            stack = [(self.root, 0)]
+            while stack:
+                node, depth = stack.pop()
+                if not node.is_leaf():
+                    stack.append((node.right_node, depth + 1))
+                    stack.append((node.left_node, depth + 1))
+                elif depth == self.h:
+                    to_grow.append((node, h - depth))
+        else:
+            stack = [(self.root, 0)]
+            while stack:
+                node, depth = stack.pop()
+                if node.is_leaf() or depth == h:
+                    to_grow.append((node, h - depth))
+                    continue
+                # search the split again with the new min_split_points
+                node.points.split_feature_index = None
+                node.points.split_value = None
+                if node.points.get_gini() != 0:
+                    node.points.get_best_gain(min_split_points, self.n_jobs)
+                if (node.points.split_feature_index == node.split_feature_index
+                        and node.points.split_value == node.split_value):
+                    stack.append((node.right_node, depth + 1))
+                    stack.append((node.left_node, depth + 1))
+                else:
+                    to_grow.append((node, h - depth))
+            for node, _ in to_grow:
+                node.left_node = None
+                node.right_node = None
+                node.split_feature_index = None
+                node.split_type = None
+                node.split_value = None
+                node.points.split_feature_index = None
+                node.points.split_value = None
+
+        self.h = h
+        self.min_split_points = min_split_points
+        self.compiled = None
+        for node, node_h in to_grow:
+            self.generate(node, node_h, self.types, min_split_points)
+        if lean:
+            self.make_lean()
+        return self
+
+    def _route_points(self, features: List[List[float]], labels: List[bool], indices: np.ndarray = None) -> None:
+        """Give back to every node of a lean tree its training points,
+        by splitting them along the splits of the tree"""
+        self.points = self._root_points(features, labels, indices)
+        self.root.points = self.points
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf():
+                continue
+            node.left_node.points, node.right_node.points = node.points.split_along(node.split_feature_index,
+                                                                                    node.split_value)
+            stack.append(node.right_node)
+            stack.append(node.left_node)
+
+    def generate(self, pivot: Node, h:int, types, min_split_points : int = 1,
+                 executor: Executor = None, subtrees: List[Future] = None):
         """Generate the tree from the pivot node
+
+        The nodes waiting to be split are kept in a work list instead
+        of the call stack, so the depth of the tree is not bounded by
+        the recursion limit. They are split depth-first (the left
+        subtree before the right one) or breadth-first (level by level)
+        depending on `self.breadth_first`; the tree is the same.
             
             Parameters
             ----------
@@ -98,29 +518,149 @@ class Tree:
                 the height of the tree - depth of the pivot node
             types : List[FeaturesTypes]
                 The types of the features.
+            executor : Executor
+                If given, the subtrees of the nodes small or deep enough
+                (see `subtree_jobs` in the constructor) are grown by
+                this executor, and their futures appended to `subtrees`.
+                The subtrees themselves are grown serially.
         """
-        # if the pivot node is composed of one class or height of pivot = 0, stop and return
-        if pivot.points.get_gini() == 0 or h == 0:
-            return
-        # else, split the pivot node along the feature that provides best gain to fill left and right nodes
-        (left_class_features, left_class_labels,
-         right_class_features,right_class_lables)  = pivot.points.split_with_best_gain(min_split_points) 
-        self.split_feature_index = pivot.points.split_feature_index
-        self.split_value = pivot.points.split_value
-        # if no split can reduce gini, stop generating from this node and return
-        if self.split_feature_index == None:
-            return
-        
-        left_node_points = PointSet(left_class_features,left_class_labels,types)
-        right_node_points = PointSet(right_class_features,right_class_lables,types)
-        left_node = Node(left_node_points,None,None)
-        right_node = Node(right_node_points,None,None)
-        pivot.left_node = left_node
-        pivot.right_node = right_node
-        # recursively generate the left and right nodes
-        self.generate(left_node,h-1,types,min_split_points)
-        self.generate(right_node,h-1,types,min_split_points)
+        # the tree changes, the compiled form has to be rebuilt
+        self.compiled = None
+        # nodes waiting to be split, with their height
+        pending = collections.deque([(pivot, h)])
+        while pending:
+            pivot, h = pending.popleft() if self.breadth_first else pending.pop()
+            if self.recorder is not None:
+                pivot.points.record = self.recorder.start_node(self.h - h, len(pivot.points.labels))
+            # if the pivot node is composed of one class or height of pivot = 0, stop there
+            if pivot.points.get_gini() == 0 or h == 0:
+                self._finish_record(pivot)
+                continue
+            # else, split the pivot node along the feature that provides best gain to fill left and right nodes
+            left_node_points, right_node_points = pivot.points.split_with_best_gain(min_split_points, self.n_jobs)
+            self.split_feature_index = pivot.points.split_feature_index
+            self.split_value = pivot.points.split_value
+            self._finish_record(pivot)
+            # if no split can reduce gini, stop generating from this node
+            # (read from the pivot, other threads may be writing self.split_feature_index)
+            if pivot.points.split_feature_index == None:
+                continue
+            
+            pivot.split_feature_index = pivot.points.split_feature_index
+            pivot.split_type = types[pivot.split_feature_index]
+            pivot.split_value = pivot.points.split_value
+            left_node = Node(left_node_points,None,None)
+            right_node = Node(right_node_points,None,None)
+            pivot.left_node = left_node
+            pivot.right_node = right_node
+            # then generate the left and right nodes, the left one first
+            children = []
+            for child in (left_node, right_node):
+                if executor is not None and (self.h - (h-1) >= self.subtree_min_depth
+                                             or (self.subtree_max_size is not None
+                                                 and len(child.points.labels) <= self.subtree_max_size)):
+                    subtrees.append(executor.submit(self.generate, child, h-1, types, min_split_points))
+                else:
+                    children.append((child, h-1))
+            pending.extend(children if self.breadth_first else reversed(children))
     
+    def generate_best_first(self, pivot: Node, h: int, types, min_split_points: int = 1):
+        """Generate the tree from the pivot node, best split first
+
+        The leaves that can be split wait in a priority queue ordered
+        by the Gini gain of their best split (the oldest leaf first in
+        case of ties). The leaf with the largest gain is split and its
+        children are searched and queued, until the tree has
+        `self.max_leaves` leaves or the queue is empty. A leaf is not
+        queued if its best gain is below `self.min_gain`, if it is
+        pure, or if it is at depth h.
+
+            Parameters
+            ----------
+            h: height of the pivot node, which equals to
+                the height of the tree - depth of the pivot node,
+                None if the depth is unlimited (the pivot is then
+                the root)
+            types : List[FeaturesTypes]
+                The types of the features.
+        """
+        # the tree changes, the compiled form has to be rebuilt
+        self.compiled = None
+        leaves_count = 1
+        # (-gain, insertion order, node, height of the node, depth of the node)
+        queue = []
+        insertion_order = itertools.count()
+        nodes = [(pivot, h, 0 if h is None else self.h - h)]
+        while nodes:
+            # once the budget is used up, the new leaves are not searched
+            budget_left = self.max_leaves is None or leaves_count < self.max_leaves
+            for node, node_h, depth in nodes:
+                if not budget_left:
+                    if self.recorder is not None:
+                        node.points.record = self.recorder.start_node(depth, len(node.points.labels))
+                        self._finish_record(node)
+                    continue
+                gain = self._best_first_gain(node, node_h, depth, min_split_points)
+                if gain is not None:
+                    heapq.heappush(queue, (-gain, next(insertion_order), node, node_h, depth))
+            nodes = []
+            if not queue or not budget_left:
+                break
+            _, _, node, node_h, depth = heapq.heappop(queue)
+            if node.points.record is not None:
+                node.points.record.resume()
+            left_node_points, right_node_points = node.points.split_along(node.points.split_feature_index,
+                                                                          node.points.split_value,
+                                                                          node.points.split_label_counts)
+            self.split_feature_index = node.points.split_feature_index
+            self.split_value = node.points.split_value
+            self._finish_record(node)
+            node.split_feature_index = node.points.split_feature_index
+            node.split_type = types[node.split_feature_index]
+            node.split_value = node.points.split_value
+            node.left_node = Node(left_node_points,None,None)
+            node.right_node = Node(right_node_points,None,None)
+            leaves_count += 1
+            child_h = None if node_h is None else node_h-1
+            nodes = [(node.left_node, child_h, depth + 1), (node.right_node, child_h, depth + 1)]
+        # the leaves left in the queue are not split
+        for _, _, node, _, _ in queue:
+            node.points.split_feature_index = None
+            node.points.split_value = None
+            self._finish_record(node)
+
+    def _best_first_gain(self, node: Node, h: int, depth: int, min_split_points: int) -> float:
+        """Search the best split of a leaf for generate_best_first()
+        (`h` is the height of the leaf, None if unlimited)
+
+        Returns
+        -------
+            float
+                The Gini gain of the best split of the leaf, None if the
+                leaf must not be split
+        """
+        if self.recorder is not None:
+            node.points.record = self.recorder.start_node(depth, len(node.points.labels))
+        if node.points.get_gini() == 0 or h == 0:
+            self._finish_record(node)
+            return None
+        _, gain = node.points.get_best_gain(min_split_points, self.n_jobs)
+        if gain == None or (self.min_gain is not None and gain < self.min_gain):
+            node.points.split_feature_index = None
+            node.points.split_value = None
+            self._finish_record(node)
+            return None
+        if node.points.record is not None:
+            node.points.record.pause()
+        return gain
+
+    def _finish_record(self, pivot: Node) -> None:
+        """Hand the record of a node grown by generate() to the recorder"""
+        if pivot.points.record is None:
+            return
+        self.recorder.finish_node(pivot.points.record, pivot.points.split_feature_index)
+        pivot.points.record = None
+
     def decide(self, features: List[float]) -> bool:
         """Give the guessed label of the tree to an unlabeled point
 
@@ -135,17 +675,53 @@ class Tree:
                 The label of the unlabeled point,
                 guessed by the Tree
         """
+        if self._root is None:
+            return bool(self.compiled.predict([features])[0])
+        return self.get_leaf(features).decision
+
+    def decide_proba(self, features: List[float]) -> float:
+        """Give the probability that an unlabeled point has a true label
+
+        Parameters
+        ----------
+            features : List[float]
+                The features of the unlabeled point.
+
+        Returns
+        -------
+            float
+                The proportion of true labels among the training points
+                of the leaf the point falls in
+        """
+        if self._root is None:
+            return float(self.compiled.predict_proba([features])[0])
+        leaf = self.get_leaf(features)
+        return leaf.true_count/(leaf.true_count + leaf.false_count)
+
+    def get_leaf(self, features: List[float]) -> Node:
+        """Find the leaf an unlabeled point falls in
+
+        Parameters
+        ----------
+            features : List[float]
+                The features of the unlabeled point.
+
+        Returns
+        -------
+            Node
+                The leaf reached by the point
+        """
         # parse the decision tree and assign the point to a leaf
         now_node = self.root
         while now_node.is_leaf() == False:
-            self.split_feature_index = now_node.points.split_feature_index
-            self.split_value = now_node.points.split_value
-            if now_node.points.types[self.split_feature_index] == FeaturesTypes.BOOLEAN:
+            self.split_feature_index = now_node.split_feature_index
+            self.split_value = now_node.split_value
+            if now_node.split_type == FeaturesTypes.BOOLEAN:
                 if features[self.split_feature_index]:
                     now_node = now_node.left_node
                 else:
                     now_node = now_node.right_node
-            elif now_node.points.types[self.split_feature_index] == FeaturesTypes.CLASSES:
+            elif now_node.split_type == FeaturesTypes.CLASSES:
                 if features[self.split_feature_index] == self.split_value:
                     now_node = now_node.left_node
                 else:
@@ -156,17 +732,154 @@ class Tree:
                 else:
                     now_node = now_node.right_node
         
-        #test the leaf is true label or false label
-        true_count = 0
-        false_count = 0
-        for label in now_node.points.labels:
-            if label == True:
-                true_count += 1
-            else:
-                false_count += 1
-        
-        return true_count > false_count
-        
-    
+        return now_node
+
+    def make_lean(self) -> None:
+        """Drop the training points from the tree
+
+        The nodes keep only their split and their label counts, which
+        is all decide() and predict() need, so the training arrays can
+        be freed.
+        """
+        self.points = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            node.points = None
+            if not node.is_leaf():
+                stack.append(node.left_node)
+                stack.append(node.right_node)
+
+    def truncate(self, h: int) -> 'Tree':
+        """Copy the top levels of the tree
+
+        The splits of a tree grown with height h are the first h levels
+        of a higher tree grown on the same points with the same
+        min_split_points, so one fit at the largest height gives the
+        trees of all the smaller heights.
+
+        Parameters
+        ----------
+            h : int
+                The height of the copy, at most the height of the tree.
+                The nodes at depth h become leaves, with the label of
+                their training points.
+
+        Returns
+        -------
+            Tree
+                A lean tree, the same as Tree(features, labels, types, h,
+                min_split_points) would build
+        """
+        if self.max_leaves is not None or self.min_gain is not None:
+            raise ValueError("a tree grown best-first cannot be truncated")
+        if self.h is not None and h > self.h:
+            raise ValueError(f"cannot truncate a tree of height {self.h} to height {h}")
+        root = Node(None)
+        stack = [(self.root, root, 0)]
+        while stack:
+            node, copy, depth = stack.pop()
+            copy.set_label_counts(node.true_count, node.false_count)
+            if node.is_leaf() or depth == h:
+                continue
+            copy.split_feature_index = node.split_feature_index
+            copy.split_type = node.split_type
+            copy.split_value = node.split_value
+            copy.left_node = Node(None)
+            copy.right_node = Node(None)
+            stack.append((node.left_node, copy.left_node, depth + 1))
+            stack.append((node.right_node, copy.right_node, depth + 1))
+        return Tree.from_nodes(root, self.types, h, self.min_split_points,
+                               self.max_bins, self.candidate_features, self.settings_known)
+
+    def predict_depths(self, features: List[List[float]], heights: List[int]) -> Dict[int, np.ndarray]:
+        """Give the labels guessed by the truncations of the tree at
+        several heights (see truncate()), in one prediction pass
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+            heights : List[int]
+                The heights of the truncations, at most the height of
+                the tree.
+
+        Returns
+        -------
+            Dict[int, np.array[bool]]
+                For each height, the labels truncate(height).predict()
+                would give
+        """
+        if self.max_leaves is not None or self.min_gain is not None:
+            raise ValueError("a tree grown best-first cannot be truncated")
+        if self.h is not None and max(heights, default=0) > self.h:
+            raise ValueError(f"cannot truncate a tree of height {self.h} to height {max(heights)}")
+        if self.compiled is None:
+            self.compile()
+        return dict(zip(heights, self.compiled.predict_depths(features, heights)))
+
+    @classmethod
+    def fit_depths(cls,
+                   features: List[List[float]],
+                   labels: List[bool],
+                   types: List[FeaturesTypes],
+                   heights: List[int],
+                   **tree_params) -> Dict[int, 'Tree']:
+        """Fit the trees of several heights with a single fit
+
+        Parameters
+        ----------
+            features, labels, types
+                The training points, see the constructor.
+            heights : List[int]
+                The heights of the trees.
+            tree_params
+                The other parameters of the trees (min_split_points,
+                max_bins...), see the constructor. The trees cannot be
+                grown best-first (max_leaves, min_gain): a smaller
+                budget is not a prefix of a larger one.
+
+        Returns
+        -------
+            Dict[int, Tree]
+                For each height, the tree Tree(features, labels, types,
+                height, **tree_params) would build. The tree of the
+                largest height is the one fitted, the others are its
+                truncations.
+        """
+        if tree_params.get('max_leaves') is not None or tree_params.get('min_gain') is not None:
+            raise ValueError("the trees grown best-first of several heights are not truncations of each other")
+        tree = cls(features, labels, types, max(heights), **tree_params)
+        return {h: tree if h == tree.h else tree.truncate(h) for h in heights}
+
+    def compile(self) -> CompiledTree:
+        """Flatten the tree into arrays for batch prediction
+
+        Returns
+        -------
+            CompiledTree
+                The compiled tree, also kept in `compiled`
+        """
+        if self._root is None:
+            # built by from_compiled(), the compiled tree is all there is
+            return self.compiled
+        self.compiled = CompiledTree(self.root)
+        return self.compiled
 
-        
\ No newline at end of file
+    def predict(self, features: List[List[float]]) -> np.ndarray:
+        """Give the guessed labels of a batch of unlabeled points
+
+        Parameters
+        ----------
+            features : List[List[float]]
+                The features of the unlabeled points, one line per point.
+
+        Returns
+        -------
+            np.array[bool]
+                The labels of the points, the same as calling decide()
+                on each of them
+        """
+        if self.compiled is None:
+            self.compile()
+        return self.compiled.predict(features)
@@ -0,0 +1,205 @@
+from typing import Callable, Dict, List, Tuple
+
+import argparse
+import json
+import platform
+import time
+import numpy as np
+from PointSet import FeaturesTypes, PointSet
+from Tree import Tree
+
+TYPE_OF_LETTER = {'b': FeaturesTypes.BOOLEAN, 'c': FeaturesTypes.CLASSES, 'r': FeaturesTypes.REAL}
+# the fields of a record that are measured or compared, not parameters of the case
+RESULT_FIELDS = ('best', 'median', 'baseline', 'ratio', 'regression')
+
+def generate_data(rows: int,
+                  columns: int,
+                  mix: str = 'bcr',
+                  cardinality: int = 5,
+                  noise: float = 0.1,
+                  seed: int = 0) -> Tuple[np.ndarray, np.ndarray, List[FeaturesTypes]]:
+    """Generate a synthetic labeled dataset
+
+    The labels come from a random linear score of the features
+    (each category of a CLASSES feature gets its own weight), thresholded
+    at its median, then a proportion `noise` of them is flipped.
+
+    Parameters
+    ----------
+        rows : int
+            The number of points.
+        columns : int
+            The number of features.
+        mix : str default='bcr'
+            The types of the features, written as in the header of the
+            data files ('b', 'c' or 'r'), repeated cyclically over the
+            columns.
+        cardinality : int default=5
+            The number of categories of the CLASSES features.
+        noise : float default=0.1
+            The proportion of flipped labels.
+        seed : int default=0
+            The seed of the generator.
+
+    Returns
+    -------
+        np.array[float]
+            The features of the points, one line per point
+        np.array[bool]
+            The labels of the points
+        List[FeaturesTypes]
+            The types of the features
+    """
+    generator = np.random.default_rng(seed)
+    types = [TYPE_OF_LETTER[mix[j % len(mix)]] for j in range(columns)]
+    features = np.empty((rows, columns))
+    score = np.zeros(rows)
+    for feature_index, feature_type in enumerate(types):
+        if feature_type == FeaturesTypes.BOOLEAN:
+            column = generator.integers(0, 2, rows).astype(float)
+            score += generator.normal()*column
+        elif feature_type == FeaturesTypes.CLASSES:
+            column = generator.integers(0, cardinality, rows).astype(float)
+            score += generator.normal(size=cardinality)[column.astype(np.intp)]
+        else: # feature_type == FeaturesTypes.REAL
+            column = np.round(generator.normal(size=rows), 3)
+            score += generator.normal()*column
+        features[:, feature_index] = column
+    labels = score > np.median(score)
+    labels ^= generator.random(rows) < noise
+    return features, labels, types
+
+def time_call(function: Callable[[], object], repeat: int = 3) -> Dict[str, float]:
+    """Time several calls of a function
+
+    Returns
+    -------
+        Dict[str, float]
+            The best and the median time of a call, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'median': float(np.median(times))}
+
+def run_benchmarks(rows: List[int],
+                   columns: List[int],
+                   mix: str = 'bcr',
+                   cardinality: int = 5,
+                   noise: float = 0.1,
+                   heights: List[int] = None,
+                   min_split_points: List[int] = None,
+                   repeat: int = 3,
+                   seed: int = 0) -> List[Dict]:
+    """Time the split search, the training and the prediction on
+    synthetic datasets of every size
+
+    Parameters
+    ----------
+        rows : List[int]
+            The numbers of points of the datasets.
+        columns : List[int]
+            The numbers of features of the datasets.
+        mix, cardinality, noise, seed
+            See generate_data().
+        heights : List[int] default=None
+            The heights of the trained trees, [1, 3, 5] by default.
+        min_split_points : List[int] default=None
+            The min_split_points of the trained trees, [1, 8] by default.
+        repeat : int default=3
+            The number of timed calls of each case.
+
+    Returns
+    -------
+        List[Dict]
+            One record per case: its name, its parameters and its times
+    """
+    if heights is None:
+        heights = [1, 3, 5]
+    if min_split_points is None:
+        min_split_points = [1, 8]
+    records = []
+    for rows_count in rows:
+        for columns_count in columns:
+            features, labels, types = generate_data(rows_count, columns_count, mix, cardinality, noise, seed)
+            dataset = {'rows': rows_count, 'columns': columns_count, 'mix': mix,
+                       'cardinality': cardinality, 'noise': noise, 'seed': seed}
+
+            times = time_call(lambda: PointSet(features, labels, types).get_best_gain(), repeat)
+            records.append({'case': 'get_best_gain', **dataset, **times})
+            for h in heights:
+                for msp in min_split_points:
+                    times = time_call(lambda: Tree(features, labels, types, h=h, min_split_points=msp), repeat)
+                    records.append({'case': 'fit', 'h': h, 'min_split_points': msp, **dataset, **times})
+            tree = Tree(features, labels, types, h=max(heights))
+            times = time_call(lambda: tree.predict(features), repeat)
+            records.append({'case': 'predict', 'h': max(heights), **dataset, **times})
+    return records
+
+def record_key(record: Dict) -> str:
+    """Identifies the same case in two runs, whether or not they were
+    compared to a baseline"""
+    return json.dumps({name: value for name, value in record.items() if name not in RESULT_FIELDS},
+                      sort_keys=True)
+
+def flag_regressions(records: List[Dict], baseline: List[Dict], tolerance: float = 1.25) -> List[Dict]:
+    """Compare a run with a previous one
+
+    Each record found in the baseline gets its `baseline` best time,
+    the `ratio` of the two and a `regression` flag, set when the case
+    got more than `tolerance` times slower.
+
+    Returns
+    -------
+        List[Dict]
+            The records which are regressions
+    """
+    baseline_times = {record_key(record): record['best'] for record in baseline}
+    regressions = []
+    for record in records:
+        key = record_key(record)
+        if key not in baseline_times:
+            continue
+        record['baseline'] = baseline_times[key]
+        record['ratio'] = record['best']/baseline_times[key] if baseline_times[key] > 0 else float('inf')
+        record['regression'] = record['ratio'] > tolerance
+        if record['regression']:
+            regressions.append(record)
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the decision trees on synthetic data')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--columns', type=int, nargs='+', default=[10])
+    parser.add_argument('--mix', default='bcr', help='types of the features, repeated, e.g. "bcr" or "rrc"')
+    parser.add_argument('--cardinality', type=int, default=5)
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--heights', type=int, nargs='+', default=[1, 3, 5])
+    parser.add_argument('--min-split-points', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', help='results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='slowdown ratio above which a case is flagged as a regression')
+    args = parser.parse_args()
+
+    records = run_benchmarks(args.rows, args.columns, args.mix, args.cardinality, args.noise,
+                             args.heights, args.min_split_points, args.repeat, args.seed)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = flag_regressions(records, json.load(baseline_file)['records'], args.tolerance)
+    with open(args.output, 'w') as output_file:
+        json.dump({'python': platform.python_version(), 'numpy': np.__version__,
+                   'machine': platform.machine(), 'records': records}, output_file, indent=1)
+
+    for record in records:
+        print(f"{record['case']:14} {record['rows']:>8} x {record['columns']:<4}"
+              f" h={record.get('h', '-')} msp={record.get('min_split_points', '-')}"
+              f" {record['best']*1000:10.2f} ms" + (' REGRESSION' if record.get('regression') else ''))
+    if regressions:
+        print(f'{len(regressions)} regression(s) against {args.baseline}')
+        raise SystemExit(1)
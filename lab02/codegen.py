@@ -0,0 +1,164 @@
+from typing import Callable, List
+
+import math
+import numpy as np
+from PointSet import FeaturesTypes
+from Tree import Node, Tree
+
+# deepest nesting emitted in one generated function, deeper subtrees get
+# their own function (the Python parser limits indentation and parentheses)
+MAX_NESTING = 50
+
+def generate_source(tree: Tree, function_name: str = 'decide') -> str:
+    """Generate the Python source of a function deciding like the tree
+
+    The function is a nest of `if` statements on `features[i] < threshold`
+    (REAL), `features[i] == category` (CLASSES) or `features[i]`
+    (BOOLEAN), with the constants written in the source, and returns
+    the label of the leaf. It does the same as Tree.decide() without
+    any attribute lookup or FeaturesTypes comparison.
+
+    Parameters
+    ----------
+        tree : Tree
+            A fitted tree
+        function_name : str default='decide'
+            The name of the generated function
+
+    Returns
+    -------
+        str
+            The source of the function (and of its helper functions
+            for the parts of the tree deeper than MAX_NESTING)
+    """
+    functions = [(function_name, tree.root)]
+    subtrees_count = 0
+    lines = []
+    while functions:
+        name, root = functions.pop(0)
+        lines.append(f'def {name}(features):')
+        # items are either a node to emit or a line of code, with their indentation
+        stack = [(root, 1)]
+        while stack:
+            item, indent = stack.pop()
+            pad = '    '*indent
+            if isinstance(item, str):
+                lines.append(pad + item)
+            elif item.is_leaf():
+                lines.append(f'{pad}return {item.decision}')
+            elif indent > MAX_NESTING:
+                subtrees_count += 1
+                subtree_name = f'_{function_name}_subtree_{subtrees_count}'
+                functions.append((subtree_name, item))
+                lines.append(f'{pad}return {subtree_name}(features)')
+            else:
+                lines.append(f'{pad}if {_condition(item, "features[{}]")}:')
+                stack.append((item.right_node, indent + 1))
+                stack.append(('else:', indent))
+                stack.append((item.left_node, indent + 1))
+        lines.append('')
+    return '\n'.join(lines)
+
+def compile_decide(tree: Tree) -> Callable[[List[float]], bool]:
+    """Compile a tree into a specialized Python function
+
+    Parameters
+    ----------
+        tree : Tree
+            A fitted tree
+
+    Returns
+    -------
+        Callable[[List[float]], bool]
+            A function giving the same label as tree.decide() to the
+            features of a point
+    """
+    namespace = {}
+    exec(compile(generate_source(tree), '<generated tree>', 'exec'), namespace)
+    return namespace['decide']
+
+def generate_numpy_source(tree: Tree, function_name: str = 'predict') -> str:
+    """Generate the source of a batch prediction function using np.where
+
+    The function evaluates one nested np.where expression over the
+    columns of the batch. Every node is evaluated for all the points,
+    so it suits small trees; CompiledTree.predict() scales better with
+    the number of nodes.
+
+    Parameters
+    ----------
+        tree : Tree
+            A fitted tree
+        function_name : str default='predict'
+            The name of the generated function
+
+    Returns
+    -------
+        str
+            The source of the function (and of its helper functions
+            for the parts of the tree deeper than MAX_NESTING). It
+            expects NumPy to be available as `np`.
+    """
+    functions = [(function_name, tree.root)]
+    subtrees_count = 0
+    sources = []
+    while functions:
+        name, root = functions.pop(0)
+        # the expression is built from the leaves up, each node waits for its two children
+        expressions = {}
+        stack = [(root, 0, False)]
+        while stack:
+            node, depth, children_done = stack.pop()
+            if node.is_leaf():
+                expressions[id(node)] = str(node.decision)
+            elif depth >= MAX_NESTING:
+                subtrees_count += 1
+                subtree_name = f'_{function_name}_subtree_{subtrees_count}'
+                functions.append((subtree_name, node))
+                expressions[id(node)] = f'{subtree_name}(features)'
+            elif not children_done:
+                stack.append((node, depth, True))
+                stack.append((node.right_node, depth + 1, False))
+                stack.append((node.left_node, depth + 1, False))
+            else:
+                expressions[id(node)] = (f'np.where({_condition(node, "features[:, {}]", True)}, '
+                                         f'{expressions.pop(id(node.left_node))}, '
+                                         f'{expressions.pop(id(node.right_node))})')
+        sources.append(f'def {name}(features):\n'
+                       f'    features = np.asarray(features, dtype=float)\n'
+                       f'    return np.broadcast_to({expressions[id(root)]}, len(features)).copy()\n')
+    return '\n'.join(sources)
+
+def compile_predict(tree: Tree) -> Callable[[List[List[float]]], np.ndarray]:
+    """Compile a tree into a specialized batch prediction function
+
+    Parameters
+    ----------
+        tree : Tree
+            A fitted tree
+
+    Returns
+    -------
+        Callable[[List[List[float]]], np.ndarray]
+            A function giving the same labels as tree.predict() to a
+            batch of points
+    """
+    namespace = {'np': np}
+    exec(compile(generate_numpy_source(tree), '<generated tree>', 'exec'), namespace)
+    return namespace['predict']
+
+def _condition(node: Node, feature: str, vectorized: bool = False) -> str:
+    """Source of the test sending a point to the left child of a node"""
+    feature = feature.format(node.split_feature_index)
+    if node.split_type == FeaturesTypes.BOOLEAN:
+        return f'{feature} != 0' if vectorized else feature
+    elif node.split_type == FeaturesTypes.CLASSES:
+        return f'{feature} == {_literal(node.split_value)}'
+    return f'{feature} < {_literal(node.split_value)}'
+
+def _literal(value: float) -> str:
+    """Source of a float constant that reads back to the same value"""
+    value = float(value)
+    if math.isfinite(value):
+        return repr(value)
+    return f"float('{value}')"
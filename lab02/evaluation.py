@@ -1,60 +1,164 @@
-from typing import List
-
-def precision_recall(expected_results: List[bool], actual_results: List[bool]) -> (float, float):
-    """Compute the precision and recall of a series of predictions
-
-    Parameters
-    ----------
-        expected_results : List[bool]
-            The true results, that is the results that the predictor
-            should have find.
-        actual_results : List[bool]
-            The predicted results, that have to be evaluated.
-
-    Returns
-    -------
-        float
-            The precision of the predicted results.
-        float
-            The recall of the predicted results.
-    """
-    ##counts TP FP FN
-    TP = 0
-    FP = 0
-    FN = 0
-    for i in range(len(expected_results)):
-        if expected_results[i] == True and actual_results[i] == True:
-            TP += 1
-        elif expected_results[i] == False and actual_results[i] == True:
-            FP += 1
-        elif expected_results[i] == True and actual_results[i] == False:
-            FN += 1
-    #calculates recall and precision        
-    recall = TP/(TP+FN)
-    precision = TP/(TP+FP)
-    
-    return (precision, recall)
-   
-
-def F1_score(expected_results: List[bool], actual_results: List[bool]) -> float:
-    """Compute the F1-score of a series of predictions
-
-    Parameters
-    ----------
-        expected_results : List[bool]
-            The true results, that is the results that the predictor
-            should have find.
-        actual_results : List[bool]
-            The predicted results, that have to be evaluated.
-
-    Returns
-    -------
-        float
-            The F1-score of the predicted results.
-    """
-    precision, recall = precision_recall(expected_results, actual_results)
-    
-    F1 = 2*precision*recall/(precision+recall)
-    
-    return F1
-    
+from typing import List, Tuple
+
+import numpy as np
+
+def confusion_matrix(expected_results: List[bool], actual_results: List[bool]) -> Tuple[int, int, int, int]:
+    """Count the outcomes of a series of predictions
+
+    Parameters
+    ----------
+        expected_results : List[bool]
+            The true results, that is the results that the predictor
+            should have find.
+        actual_results : List[bool]
+            The predicted results, that have to be evaluated. Lists
+            and NumPy arrays are both counted without a Python loop.
+
+    Returns
+    -------
+        int
+            The number of true positives (TP)
+        int
+            The number of false positives (FP)
+        int
+            The number of false negatives (FN)
+        int
+            The number of true negatives (TN)
+    """
+    expected_results = np.asarray(expected_results, dtype=bool).reshape(-1)
+    actual_results = np.asarray(actual_results, dtype=bool).reshape(-1)
+    if len(expected_results) != len(actual_results):
+        raise ValueError(f"{len(expected_results)} expected results but {len(actual_results)} actual results")
+    TP = int(np.count_nonzero(expected_results & actual_results))
+    FP = int(np.count_nonzero(actual_results)) - TP
+    FN = int(np.count_nonzero(expected_results)) - TP
+    TN = len(expected_results) - TP - FP - FN
+    return (TP, FP, FN, TN)
+
+class ConfusionMatrix:
+    """Counts of the outcomes of predictions, accumulated batch by batch
+
+    The counts of several accumulators (for instance one per worker)
+    can be merged, so the metrics of a large series of predictions are
+    computed without holding the whole series in memory.
+
+    Attributes
+    ----------
+        TP : int
+            The number of true positives
+        FP : int
+            The number of false positives
+        FN : int
+            The number of false negatives
+        TN : int
+            The number of true negatives
+    """
+    def __init__(self, TP: int = 0, FP: int = 0, FN: int = 0, TN: int = 0):
+        self.TP = TP
+        self.FP = FP
+        self.FN = FN
+        self.TN = TN
+
+    def update(self, expected_results: List[bool], actual_results: List[bool]) -> 'ConfusionMatrix':
+        """Add a batch of predictions to the counts, see confusion_matrix()
+
+        Returns
+        -------
+            ConfusionMatrix
+                self, so that calls can be chained
+        """
+        TP, FP, FN, TN = confusion_matrix(expected_results, actual_results)
+        self.TP += TP
+        self.FP += FP
+        self.FN += FN
+        self.TN += TN
+        return self
+
+    def merge(self, other: 'ConfusionMatrix') -> 'ConfusionMatrix':
+        """Add the counts of another accumulator to these ones
+
+        Returns
+        -------
+            ConfusionMatrix
+                self, so that calls can be chained
+        """
+        self.TP += other.TP
+        self.FP += other.FP
+        self.FN += other.FN
+        self.TN += other.TN
+        return self
+
+    def __add__(self, other: 'ConfusionMatrix') -> 'ConfusionMatrix':
+        return ConfusionMatrix(self.TP, self.FP, self.FN, self.TN).merge(other)
+
+    def precision_recall(self) -> Tuple[float, float]:
+        """Compute the precision and recall of the predictions counted
+
+        Returns
+        -------
+            float
+                The precision of the predicted results, 0.0 if nothing
+                was predicted positive.
+            float
+                The recall of the predicted results, 0.0 if nothing
+                was expected positive.
+        """
+        precision = self.TP/(self.TP+self.FP) if self.TP + self.FP > 0 else 0.0
+        recall = self.TP/(self.TP+self.FN) if self.TP + self.FN > 0 else 0.0
+        return (precision, recall)
+
+    def F1_score(self) -> float:
+        """Compute the F1-score of the predictions counted
+
+        Returns
+        -------
+            float
+                The F1-score of the predicted results, 0.0 if the
+                precision and the recall are both 0.
+        """
+        precision, recall = self.precision_recall()
+        if precision + recall == 0:
+            return 0.0
+        return 2*precision*recall/(precision+recall)
+
+def precision_recall(expected_results: List[bool], actual_results: List[bool]) -> (float, float):
+    """Compute the precision and recall of a series of predictions
+
+    Parameters
+    ----------
+        expected_results : List[bool]
+            The true results, that is the results that the predictor
+            should have find.
+        actual_results : List[bool]
+            The predicted results, that have to be evaluated.
+
+    Returns
+    -------
+        float
+            The precision of the predicted results (0.0 if nothing
+            was predicted positive).
+        float
+            The recall of the predicted results (0.0 if nothing was
+            expected positive).
+    """
+    return ConfusionMatrix(*confusion_matrix(expected_results, actual_results)).precision_recall()
+
+
+def F1_score(expected_results: List[bool], actual_results: List[bool]) -> float:
+    """Compute the F1-score of a series of predictions
+
+    Parameters
+    ----------
+        expected_results : List[bool]
+            The true results, that is the results that the predictor
+            should have find.
+        actual_results : List[bool]
+            The predicted results, that have to be evaluated.
+
+    Returns
+    -------
+        float
+            The F1-score of the predicted results (0.0 if the
+            precision and the recall are both 0).
+    """
+    return ConfusionMatrix(*confusion_matrix(expected_results, actual_results)).F1_score()
@@ -1,6 +1,6 @@
 from PointSet import PointSet
 from Tree import Tree
-from read_write import load_data, write_results
+from read_write import load_data_cached as load_data, write_results
 import csv
 import sys
 import evaluation
@@ -73,9 +73,7 @@ def exercice4(files_to_study, **tree_params):
         training_nb = int(len(features)*training_proportion)
         current_tree = Tree(features[:training_nb], labels[:training_nb], types, **tree_params)
         expected_results = labels[training_nb:]
-        actual_results = []
-        for point_features in features[training_nb:]:
-            actual_results += [current_tree.decide(point_features)]
+        actual_results = current_tree.predict(features[training_nb:]).tolist()
         results += [[evaluation.F1_score(expected_results, actual_results)]]
     return results
 
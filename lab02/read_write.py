@@ -1,9 +1,32 @@
-from typing import Tuple, List
+from typing import Iterator, Tuple, List
 
 import csv
+import hashlib
+import itertools
+import os
+import warnings
+import struct
+import numpy as np
 from PointSet import FeaturesTypes
+from CompiledTree import CompiledTree
+from Tree import Tree
 
-def load_data(file_name: str) -> Tuple[List[List[float]], List[bool], List[FeaturesTypes]]:
+# first bytes and version of the files written by save_tree()
+TREE_MAGIC = b'DTREE'
+TREE_VERSION = 1
+# version, number of features, number of nodes, h and min_split_points (-1 if unknown)
+TREE_HEADER = struct.Struct('<HIIqq')
+# node arrays of a tree file, in this order
+TREE_ARRAYS = [('feature_index', '<i4'), ('split_types', '<i1'), ('split_value', '<f8'),
+               ('left', '<i4'), ('right', '<i4'), ('true_count', '<i8'), ('false_count', '<i8')]
+
+# version of the arrays stored by load_data_cached(), part of their key
+CACHE_VERSION = 2
+
+# header letter of each feature type
+TYPE_LETTERS = {FeaturesTypes.BOOLEAN: 'b', FeaturesTypes.CLASSES: 'c', FeaturesTypes.REAL: 'r'}
+
+def load_data(file_name: str) -> Tuple[np.ndarray, np.ndarray, List[FeaturesTypes]]:
     """Read the content of the file.
 
     The file should be formatted as a csv delimited by ',',
@@ -15,10 +38,15 @@ def load_data(file_name: str) -> Tuple[List[List[float]], List[bool], List[Featu
     of the following letters:
     - 'l' : if the column contains the points labels.
             Exactly one column should have this type.
+            A label is true if its cell is exactly '1' and
+            false otherwise (for instance '0', '1.0' or ' 1').
     - 'b' : if the column contains a boolean feature.
     - 'c' : if the column contains a categorial feature.
     - 'r' : if the column contains a continuous feature.
 
+    The data lines are parsed in bulk by NumPy, straight into
+    arrays, without building a Python list per point.
+
     Parameters
     ----------
         file_name : str
@@ -26,39 +54,174 @@ def load_data(file_name: str) -> Tuple[List[List[float]], List[bool], List[Featu
 
     Returns
     -------
-        List[List[float]]
-            The features of the points. Each of the sublist
-            is related to a single point. This list does not
-            contain the labels.
-        List[bool]
+        np.array[float]
+            The features of the points. Each line is related
+            to a single point. This array does not contain the
+            labels.
+        np.array[bool]
             The labels of the points.
         List[FeaturesTypes]
             The types of the features.
     """
     with open(file_name) as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=',')
-        labels = []
-        features = []
-        features_types = []
-        label_id = -1
-        for i, datum in enumerate(next(csv_reader)):
-            if datum=='l':
-                label_id = i
-            elif datum=='b':
-                features_types += [FeaturesTypes.BOOLEAN]
-            elif datum=='c':
-                features_types += [FeaturesTypes.CLASSES]
-            elif datum=='r':
-                features_types += [FeaturesTypes.REAL]
-            else:
-                raise NotImplementedError(f'Unknown data type header : {datum}')
-        if label_id < 0:
-            raise Exception('Label ID not found in file header')
-        for line in csv_reader:
-            labels += [line[label_id]=='1']
-            features += [[float(val) for i, val in enumerate(line) if i != label_id]]
+        label_id, features_types = read_header(csv_file.readline())
+        with warnings.catch_warnings():
+            # a file without any point is not an error
+            warnings.simplefilter('ignore', UserWarning)
+            data = np.loadtxt(csv_file, delimiter=',', dtype=float, ndmin=2,
+                              converters=_label_converters(label_id))
+    data = data.reshape(-1, len(features_types) + 1)
+    labels = data[:, label_id] == 1
+    if label_id == len(features_types):
+        features = data[:, :label_id]
+    else:
+        features = np.delete(data, label_id, axis=1)
     return features, labels, features_types
 
+def _label_converters(label_id: int) -> dict:
+    """The loadtxt converters that turn the label cells into 1 (true)
+    or 0 (false): only a cell that is exactly '1' is true"""
+    return {label_id: lambda cell: cell == '1'}
+
+def load_data_cached(file_name: str, cache_dir: str = None) -> Tuple[np.ndarray, np.ndarray, List[FeaturesTypes]]:
+    """Read the content of the file through a binary cache.
+
+    The first load parses the file with load_data() and stores the
+    features, the labels and the types in `cache_dir`, keyed by the
+    SHA-256 of the file content. The following loads memory-map the
+    stored arrays instead of parsing the text again: nothing is copied
+    and the pages are shared by all the processes reading the same
+    file. The file is only hashed again when its size or modification
+    time changes.
+
+    Parameters
+    ----------
+        file_name : str
+            The name or path of the file to read, see load_data()
+        cache_dir : str
+            The directory of the cache, by default a '.dataset_cache'
+            directory next to the file
+
+    Returns
+    -------
+        np.array[float]
+            The features of the points, read-only and memory-mapped.
+        np.array[bool]
+            The labels of the points, read-only and memory-mapped.
+        List[FeaturesTypes]
+            The types of the features.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_name)), '.dataset_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # the stamp remembers the hash of the file for its current size and date
+    stat = os.stat(file_name)
+    stamp = f'{stat.st_size} {stat.st_mtime_ns}'
+    stamp_file = os.path.join(cache_dir, hashlib.sha256(os.path.abspath(file_name).encode()).hexdigest() + '.stamp')
+    file_hash = None
+    if os.path.exists(stamp_file):
+        with open(stamp_file) as stamp_reader:
+            cached_stamp, _, cached_hash = stamp_reader.read().rpartition(' ')
+        if cached_stamp == stamp:
+            file_hash = cached_hash
+    if file_hash is None:
+        hasher = hashlib.sha256()
+        with open(file_name, 'rb') as data_file:
+            for block in iter(lambda: data_file.read(1 << 20), b''):
+                hasher.update(block)
+        file_hash = hasher.hexdigest()
+        _write_atomic(stamp_file, f'{stamp} {file_hash}'.encode())
+
+    prefix = os.path.join(cache_dir, f'{file_hash}.v{CACHE_VERSION}')
+    # the types file is written last, its presence means the entry is complete
+    if not os.path.exists(prefix + '.types'):
+        features, labels, features_types = load_data(file_name)
+        for suffix, array in (('.features.npy', features), ('.labels.npy', labels)):
+            tmp_file = f'{prefix}{suffix}.{os.getpid()}.tmp'
+            with open(tmp_file, 'wb') as array_file:
+                np.save(array_file, np.ascontiguousarray(array))
+            os.replace(tmp_file, prefix + suffix)
+        _write_atomic(prefix + '.types', ''.join(TYPE_LETTERS[t] for t in features_types).encode())
+
+    with open(prefix + '.types') as types_file:
+        features_types = read_header(','.join(['l'] + list(types_file.read())))[1]
+    features = np.load(prefix + '.features.npy', mmap_mode='r')
+    labels = np.load(prefix + '.labels.npy', mmap_mode='r')
+    return features, labels, features_types
+
+def _write_atomic(file_name: str, content: bytes) -> None:
+    """Write a file so that readers never see it partially written"""
+    tmp_file = f'{file_name}.{os.getpid()}.tmp'
+    with open(tmp_file, 'wb') as dest_file:
+        dest_file.write(content)
+    os.replace(tmp_file, file_name)
+
+def load_data_chunks(file_name: str, chunk_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray, List[FeaturesTypes]]]:
+    """Read the content of the file by chunks of points.
+
+    Only `chunk_size` lines of the file are held in memory at once.
+
+    Parameters
+    ----------
+        file_name : str
+            The name or path of the file to read, see load_data()
+        chunk_size : int
+            The number of points of each chunk (the last one may be
+            smaller)
+
+    Yields
+    ------
+        np.array[float]
+            The features of the points of the chunk.
+        np.array[bool]
+            The labels of the points of the chunk.
+        List[FeaturesTypes]
+            The types of the features.
+    """
+    with open(file_name) as csv_file:
+        label_id, features_types = read_header(csv_file.readline())
+        while True:
+            lines = list(itertools.islice(csv_file, chunk_size))
+            if not lines:
+                return
+            data = np.loadtxt(lines, delimiter=',', dtype=float, ndmin=2,
+                              converters=_label_converters(label_id))
+            labels = data[:, label_id] == 1
+            yield np.delete(data, label_id, axis=1), labels, features_types
+
+def read_header(header: str) -> Tuple[int, List[FeaturesTypes]]:
+    """Parse the first line of a data file
+
+    Parameters
+    ----------
+        header : str
+            The first line of the file, see load_data()
+
+    Returns
+    -------
+        int
+            The index of the column containing the labels
+        List[FeaturesTypes]
+            The types of the features.
+    """
+    features_types = []
+    label_id = -1
+    for i, datum in enumerate(header.strip().split(',')):
+        if datum=='l':
+            label_id = i
+        elif datum=='b':
+            features_types += [FeaturesTypes.BOOLEAN]
+        elif datum=='c':
+            features_types += [FeaturesTypes.CLASSES]
+        elif datum=='r':
+            features_types += [FeaturesTypes.REAL]
+        else:
+            raise NotImplementedError(f'Unknown data type header : {datum}')
+    if label_id < 0:
+        raise Exception('Label ID not found in file header')
+    return label_id, features_types
+
 def format_result(result) -> str:
     """Format a result into an unambiguous string
 
@@ -95,3 +258,62 @@ def write_results(results: List[List], file_name: str) -> None:
         csv_writer = csv.writer(dest_file, delimiter=',', lineterminator='\r\n')
         csv_writer.writerows(results)
 
+def save_tree(tree: Tree, file_name: str) -> None:
+    """Write a fitted tree into a compact binary file
+
+    Only the structure of the tree is written: for each node its split
+    feature, the type and value of the split, its children and its
+    label counts. No training point is written.
+
+    Parameters
+    ----------
+        tree : Tree
+            The tree to write
+        file_name : str
+            The name or path of the file to write
+    """
+    compiled = tree.compile()
+    header = TREE_HEADER.pack(TREE_VERSION, len(tree.types), len(compiled.left),
+                              -1 if tree.h is None else tree.h,
+                              -1 if tree.min_split_points is None else tree.min_split_points)
+    with open(file_name, 'wb') as tree_file:
+        tree_file.write(TREE_MAGIC)
+        tree_file.write(header)
+        tree_file.write(bytes(feature_type.value for feature_type in tree.types))
+        for name, dtype in TREE_ARRAYS:
+            tree_file.write(getattr(compiled, name).astype(dtype).tobytes())
+
+def load_tree(file_name: str) -> Tree:
+    """Read a tree written by save_tree()
+
+    Parameters
+    ----------
+        file_name : str
+            The name or path of the file to read
+
+    Returns
+    -------
+        Tree
+            A lean tree that gives the same decisions as the saved one.
+            It predicts with the saved arrays, its nodes are only built
+            when they are needed (see Tree.from_compiled()).
+    """
+    with open(file_name, 'rb') as tree_file:
+        content = tree_file.read()
+    if not content.startswith(TREE_MAGIC):
+        raise ValueError(f'{file_name} is not a tree file')
+    offset = len(TREE_MAGIC)
+    version, features_count, nodes_count, h, min_split_points = TREE_HEADER.unpack_from(content, offset)
+    if version != TREE_VERSION:
+        raise ValueError(f'Unsupported tree file version {version} (expected {TREE_VERSION})')
+    offset += TREE_HEADER.size
+    types = [FeaturesTypes(value) for value in content[offset:offset + features_count]]
+    offset += features_count
+    arrays = {}
+    for name, dtype in TREE_ARRAYS:
+        arrays[name] = np.frombuffer(content, dtype, nodes_count, offset)
+        offset += arrays[name].nbytes
+
+    return Tree.from_compiled(CompiledTree.from_arrays(**arrays), types,
+                              None if h < 0 else h,
+                              None if min_split_points < 0 else min_split_points)
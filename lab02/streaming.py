@@ -0,0 +1,276 @@
+from typing import List, Tuple
+
+import numpy as np
+from PointSet import FeaturesTypes, best_candidate, best_histogram_threshold
+from Tree import Node, Tree
+from CompiledTree import CompiledTree, preorder_nodes
+from read_write import load_data_chunks, read_header
+
+def fit_streaming(file_name: str,
+                  h: int = 1,
+                  min_split_points: int = 1,
+                  max_bins: int = 256,
+                  chunk_size: int = 100000,
+                  sample_size: int = 100000,
+                  seed: int = 0) -> Tree:
+    """Train a Tree on a csv file without loading it in memory
+
+    The file is read by chunks of `chunk_size` points. A first pass
+    learns the bins of the features (see learn_bins()), then the tree
+    is grown level by level: each pass over the file routes every
+    point through the levels already built and adds it to the label
+    histograms of the leaf it reaches. The splits of all the leaves of
+    the level are then chosen from these histograms, with the same
+    rules as Tree (Gini gain, `h`, `min_split_points`, ties).
+
+    The memory used is bounded by the chunk, the sample used for the
+    bin edges and the histograms of one level, whatever the number of
+    points in the file. When no REAL feature has more than `max_bins`
+    distinct values, the tree is the one Tree would build from the
+    whole file.
+
+    Parameters
+    ----------
+        file_name : str
+            The name or path of the file to read, see read_write.load_data()
+        h : int default=1
+            The height of the tree.
+        min_split_points : int default=1
+            The minimal number of training points in each node.
+        max_bins : int default=256
+            The maximal number of bins of each REAL feature.
+        chunk_size : int default=100000
+            The number of points read from the file at once.
+        sample_size : int default=100000
+            The number of points sampled to compute the bin edges of
+            the REAL features with many distinct values.
+        seed : int default=0
+            The seed of the sampling.
+
+    Returns
+    -------
+        Tree
+            The fitted tree, without training points (lean)
+    """
+    types, bin_values = learn_bins(file_name, max_bins, chunk_size, sample_size, seed)
+    bin_counts = [_bin_count(feature_type, values) for feature_type, values in zip(types, bin_values)]
+    # smallest and largest value of each bin of the REAL features, known after the first pass
+    bin_min = [np.full(count, np.inf) for count in bin_counts]
+    bin_max = [np.full(count, -np.inf) for count in bin_counts]
+
+    root = Node(None)
+    # the nodes of the current level whose split has to be searched
+    frontier = [root]
+    depth = 0
+    while frontier:
+        nodes = preorder_nodes(root)
+        compiled = CompiledTree(root)
+        slot_of_node = np.full(len(nodes), -1, dtype=np.intp)
+        node_ids = {id(node): i for i, node in enumerate(nodes)}
+        for slot, node in enumerate(frontier):
+            slot_of_node[node_ids[id(node)]] = slot
+
+        sizes = np.zeros(len(frontier), dtype=np.int64)
+        true_labels = np.zeros(len(frontier), dtype=np.int64)
+        histogram_sizes = [np.zeros(len(frontier)*count, dtype=np.int64) for count in bin_counts]
+        histogram_true_labels = [np.zeros(len(frontier)*count, dtype=np.int64) for count in bin_counts]
+        # row number of the first point of each category in each node, for the tie-breaking
+        first_seen = [np.full(len(frontier)*count, np.iinfo(np.int64).max, dtype=np.int64)
+                      if feature_type == FeaturesTypes.CLASSES else None
+                      for feature_type, count in zip(types, bin_counts)]
+        row_offset = 0
+        for features, labels, _ in load_data_chunks(file_name, chunk_size):
+            slots = slot_of_node[compiled.get_leaves(features)]
+            kept = slots >= 0
+            rows = row_offset + np.flatnonzero(kept)
+            row_offset += len(labels)
+            if depth == 0:
+                for feature_index, feature_type in enumerate(types):
+                    if feature_type == FeaturesTypes.REAL:
+                        column = features[:, feature_index]
+                        ids = _bin_ids(column, feature_type, bin_values[feature_index])
+                        np.minimum.at(bin_min[feature_index], ids, column)
+                        np.maximum.at(bin_max[feature_index], ids, column)
+            features, labels, slots = features[kept], labels[kept], slots[kept]
+            sizes += np.bincount(slots, minlength=len(frontier))
+            true_labels += np.bincount(slots[labels], minlength=len(frontier))
+            for feature_index, feature_type in enumerate(types):
+                ids = _bin_ids(features[:, feature_index], feature_type, bin_values[feature_index])
+                keys = slots*bin_counts[feature_index] + ids
+                histogram_sizes[feature_index] += np.bincount(keys, minlength=len(histogram_sizes[feature_index]))
+                histogram_true_labels[feature_index] += np.bincount(keys[labels],
+                                                                    minlength=len(histogram_sizes[feature_index]))
+                if first_seen[feature_index] is not None:
+                    np.minimum.at(first_seen[feature_index], keys, rows)
+
+        next_frontier = []
+        for slot, node in enumerate(frontier):
+            size = int(sizes[slot])
+            node.set_label_counts(int(true_labels[slot]), size - int(true_labels[slot]))
+            if size == 0 or depth == h:
+                continue
+            gini = 1 - (node.true_count/size)**2 - (node.false_count/size)**2
+            if gini == 0:
+                continue
+            histograms = [(histogram_sizes[j][slot*count:(slot + 1)*count],
+                           histogram_true_labels[j][slot*count:(slot + 1)*count],
+                           None if first_seen[j] is None else first_seen[j][slot*count:(slot + 1)*count])
+                          for j, count in enumerate(bin_counts)]
+            split = _best_split(types, bin_values, bin_min, bin_max, histograms,
+                                size, node.true_count, gini, min_split_points)
+            if split is None:
+                continue
+            split_feature_index, split_value, true_size, true_side_labels = split
+            node.split_feature_index = split_feature_index
+            node.split_type = types[split_feature_index]
+            node.split_value = split_value
+            node.left_node = Node(None)
+            node.left_node.set_label_counts(true_side_labels, true_size - true_side_labels)
+            node.right_node = Node(None)
+            node.right_node.set_label_counts(node.true_count - true_side_labels,
+                                             node.false_count - (true_size - true_side_labels))
+            # children that cannot be split are already complete
+            for child in (node.left_node, node.right_node):
+                if depth + 1 < h and child.true_count > 0 and child.false_count > 0:
+                    next_frontier.append(child)
+        frontier = next_frontier
+        depth += 1
+
+    return Tree.from_nodes(root, types, h, min_split_points)
+
+def learn_bins(file_name: str,
+               max_bins: int = 256,
+               chunk_size: int = 100000,
+               sample_size: int = 100000,
+               seed: int = 0) -> Tuple[List[FeaturesTypes], List[np.ndarray]]:
+    """Read the file once to learn the bins of every feature
+
+    A BOOLEAN feature has 2 bins (false, true) and a CLASSES feature one
+    bin per category. A REAL feature with at most `max_bins` distinct
+    values has one bin per value, otherwise its bin edges are quantiles
+    of a uniform sample of `sample_size` points.
+
+    Parameters
+    ----------
+        file_name : str
+            The name or path of the file to read
+        max_bins : int default=256
+            The maximal number of bins of each REAL feature.
+        chunk_size : int default=100000
+            The number of points read from the file at once.
+        sample_size : int default=100000
+            The number of points sampled for the quantiles.
+        seed : int default=0
+            The seed of the sampling.
+
+    Returns
+    -------
+        List[FeaturesTypes]
+            The types of the features.
+        List[np.array[float]]
+            For each feature: None (BOOLEAN), the sorted categories
+            (CLASSES) or the bin edges (REAL)
+    """
+    with open(file_name) as csv_file:
+        types = read_header(csv_file.readline())[1]
+    real_features = [j for j, feature_type in enumerate(types) if feature_type == FeaturesTypes.REAL]
+    # distinct values of each feature, None once a REAL feature has too many of them
+    distinct_values = [None if feature_type == FeaturesTypes.BOOLEAN else np.zeros(0) for feature_type in types]
+    # bottom-k sample: the points with the sample_size smallest random keys
+    generator = np.random.default_rng(seed)
+    sample = np.zeros((0, len(real_features)))
+    sample_keys = np.zeros(0)
+    for features, _, _ in load_data_chunks(file_name, chunk_size):
+        for feature_index, feature_type in enumerate(types):
+            if distinct_values[feature_index] is None:
+                continue
+            distinct_values[feature_index] = np.union1d(distinct_values[feature_index], features[:, feature_index])
+            if feature_type == FeaturesTypes.REAL and len(distinct_values[feature_index]) > max_bins:
+                distinct_values[feature_index] = None
+        sample = np.concatenate((sample, features[:, real_features]))
+        sample_keys = np.concatenate((sample_keys, generator.random(len(features))))
+        if len(sample_keys) > sample_size:
+            kept = np.argpartition(sample_keys, sample_size)[:sample_size]
+            sample, sample_keys = sample[kept], sample_keys[kept]
+
+    bin_values = []
+    for feature_index, feature_type in enumerate(types):
+        if feature_type == FeaturesTypes.BOOLEAN:
+            bin_values.append(None)
+        elif feature_type == FeaturesTypes.CLASSES:
+            bin_values.append(distinct_values[feature_index])
+        elif distinct_values[feature_index] is not None:
+            bin_values.append(distinct_values[feature_index][1:])
+        else:
+            column = sample[:, real_features.index(feature_index)]
+            bin_values.append(np.unique(np.quantile(column, np.linspace(0, 1, max_bins + 1)[1:-1])))
+    return types, bin_values
+
+def _bin_count(feature_type: FeaturesTypes, values: np.ndarray) -> int:
+    """Number of bins of a feature, see learn_bins()"""
+    if feature_type == FeaturesTypes.BOOLEAN:
+        return 2
+    elif feature_type == FeaturesTypes.CLASSES:
+        return len(values)
+    return len(values) + 1
+
+def _bin_ids(column: np.ndarray, feature_type: FeaturesTypes, values: np.ndarray) -> np.ndarray:
+    """Bin of each value of a feature, see learn_bins()"""
+    if feature_type == FeaturesTypes.BOOLEAN:
+        return (column != 0).astype(np.intp)
+    elif feature_type == FeaturesTypes.CLASSES:
+        return np.searchsorted(values, column)
+    # bin k holds the values v such that edges[k-1] <= v < edges[k]
+    return np.searchsorted(values, column, side='right')
+
+def _best_split(types: List[FeaturesTypes],
+                bin_values: List[np.ndarray],
+                bin_min: List[np.ndarray],
+                bin_max: List[np.ndarray],
+                histograms: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                size: int,
+                total_true_labels: int,
+                gini: float,
+                min_split_points: int) -> Tuple[int, float, int, int]:
+    """Choose the split of a node from its histograms, the same way
+    PointSet.get_best_gain() does from the points
+
+    Returns
+    -------
+        Tuple[int, float, int, int]
+            The feature index, the split value, the number of points and
+            the number of true labels on the true side of the best split,
+            None if no split has a positive gain
+    """
+    max_gini_gain = 0.0
+    best_split = None
+    for feature_index, feature_type in enumerate(types):
+        bin_sizes, bin_true_labels, first_seen = histograms[feature_index]
+        if feature_type == FeaturesTypes.BOOLEAN:
+            # the true side holds the points with a non zero value (bin 1)
+            best, gini_gain = best_candidate(size, total_true_labels, bin_sizes[1:], bin_true_labels[1:],
+                                             gini, min_split_points)
+            if best == None:
+                continue
+            split = (feature_index, None, int(bin_sizes[1]), int(bin_true_labels[1]))
+        elif feature_type == FeaturesTypes.CLASSES:
+            # candidates in order of first appearance, as PointSet.sweep_classes_feature()
+            present = np.flatnonzero(bin_sizes)
+            present = present[np.argsort(first_seen[present])]
+            best, gini_gain = best_candidate(size, total_true_labels, bin_sizes[present], bin_true_labels[present],
+                                             gini, min_split_points)
+            if best == None:
+                continue
+            category = present[best]
+            split = (feature_index, bin_values[feature_index][category],
+                     int(bin_sizes[category]), int(bin_true_labels[category]))
+        else: # feature_type == FeaturesTypes.REAL
+            gini_gain, split_value, true_size, true_labels = best_histogram_threshold(
+                bin_sizes, bin_true_labels, bin_min[feature_index], bin_max[feature_index], gini, min_split_points)
+            if gini_gain == None:
+                continue
+            split = (feature_index, split_value, true_size, true_labels)
+        if gini_gain > max_gini_gain:
+            max_gini_gain = gini_gain
+            best_split = split
+    return best_split